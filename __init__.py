@@ -2,10 +2,14 @@
 from __future__ import annotations
 
 
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers import entity_registry, device_registry
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import DeviceInfo, Entity
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.json import json_bytes, json_fragment
 from homeassistant.helpers.storage import Store
 
 from homeassistant.components.sensor import (
@@ -14,6 +18,7 @@ from homeassistant.components.sensor import (
     SensorStateClass,
     ENTITY_ID_FORMAT,
 )
+from homeassistant.components.binary_sensor import DOMAIN as BINARY_SENSOR_DOMAIN
 
 from homeassistant.const import ATTR_COMMAND,  CONF_TYPE
 
@@ -24,16 +29,90 @@ import json
 from serial import SerialException
 import serial_asyncio
 import asyncio
+import time
 from functools import cached_property
 import copy
+import voluptuous as vol
 
-from .const import DOMAIN, CONF_SERIAL_PORT, CONF_BAUD
-from .sensor import EspNowSensor
+from .const import (
+    DOMAIN,
+    DATA_BRIDGES,
+    PLATFORMS,
+    CONF_SERIAL_PORT,
+    CONF_BAUD,
+    CONF_MAX_BATCH,
+    CONF_IO_THREAD,
+    CONF_QUEUE_SIZE,
+    CONF_STATS,
+    CONF_LOG_SAMPLE,
+    CONF_OFFLINE_FACTOR,
+    CONF_OFFLINE_MIN_TIMEOUT,
+    CONF_DEDUP_WINDOW,
+    CONF_TX_RATE,
+    CONF_ACK_TIMEOUT,
+    CONF_RETRIES,
+    CONF_CAPTURE_FILE,
+    CONF_CAPTURE_SIZE,
+    CONF_ALLOW_MACS,
+    CONF_DENY_MACS,
+    CONF_ONBOARD_RATE,
+    DEFAULT_MAX_BATCH,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_LOG_SAMPLE,
+    DEFAULT_OFFLINE_FACTOR,
+    DEFAULT_OFFLINE_MIN_TIMEOUT,
+    DEFAULT_DEDUP_WINDOW,
+    DEFAULT_TX_RATE,
+    DEFAULT_ACK_TIMEOUT,
+    DEFAULT_RETRIES,
+    DEFAULT_CAPTURE_SIZE,
+    DEFAULT_ONBOARD_RATE,
+    LINK_KEYS,
+    NODE_KEYS,
+    RESYNC_COMMAND,
+    RESYNC_TIMEOUT,
+    SEQUENCE_MODULO,
+    SERVICE_SEND_COMMAND,
+    STATS_INTERVAL,
+    WHEEL_INTERVAL,
+)
+from .framing import FrameSplitter, parseFrame, READ_CHUNK_SIZE
+from .reader_thread import SerialReaderThread
+from .ingest import IngestQueue, Deduplicator, dedupKey, hasEvents
+from .stats import BridgeStats, LatencyHistogram
+from .timerwheel import TimerWheel
+from .commands import CommandSender
+from .capture import CaptureWriter, replay
+from .admission import AdmissionControl
+from .linkstats import LinkStats, REORDER_WINDOW
+from .press import PressFilter, PRESS_OPTIONS
+from .sensor import EspNowSensor, EspNowBridgeSensor, EspNowLinkSensor, BRIDGE_SENSORS
 from .binary_sensor import EspNowBinarySensor
 
 
 _LOGGER = logging.getLogger("espnow")
 
+MAX_MESSAGE_PLANS = 32
+MAX_MISSING_SENSORS = 256
+# Messages closer together than this (seconds) are one burst for the learned
+# report interval
+BURST_GAP = 1.0
+SAVE_DELAY = 1.0
+
+ATTR_MAC = "mac"
+ATTR_PAYLOAD = "payload"
+ATTR_ACK = "ack"
+ATTR_WAIT = "wait"
+
+SEND_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_MAC): cv.string,
+        vol.Required(ATTR_PAYLOAD): dict,
+        vol.Optional(ATTR_ACK, default=True): cv.boolean,
+        vol.Optional(ATTR_WAIT, default=False): cv.boolean,
+    }
+)
+
 async def async_setup_entry(  # noqa: C901
     hass: HomeAssistant, config_entry: ConfigEntry
 ) -> bool:
@@ -42,10 +121,36 @@ async def async_setup_entry(  # noqa: C901
     store = Store(hass, EspNowBridge._STORAGE_VERSION, EspNowBridge._STORAGE_KEY)
     store_data = await store.async_load()
     _LOGGER.info(f"Loaded Store Data: {store_data}")
-    EspNowBridge(hass, config_entry, store, store_data)
+    capture = None
+    if config_entry.data.get(CONF_CAPTURE_FILE):
+        # Opening and sizing the file blocks, keep it off the event loop.
+        capture = await hass.async_add_executor_job(
+            CaptureWriter,
+            hass.config.path(config_entry.data[CONF_CAPTURE_FILE]),
+            config_entry.data.get(CONF_CAPTURE_SIZE, DEFAULT_CAPTURE_SIZE) * 1024 * 1024)
+    EspNowBridge(hass, config_entry, store, store_data, capture)
+    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+
+    if not hass.services.has_service(DOMAIN, SERVICE_SEND_COMMAND):
+        hass.services.async_register(
+            DOMAIN, SERVICE_SEND_COMMAND, async_send_command, schema=SEND_COMMAND_SCHEMA)
     return True
 
 
+async def async_send_command(call: ServiceCall) -> None:
+    """Send a command to a node, optionally waiting for its acknowledgement."""
+    mac = call.data[ATTR_MAC]
+    bridges = [b for b in EspNowBridge.bridges if mac in b.nodes] or EspNowBridge.bridges
+    if not bridges:
+        raise HomeAssistantError("No ESP-NOW bridge is set up")
+    future = bridges[0].sendCommand(mac, call.data[ATTR_PAYLOAD], ack=call.data[ATTR_ACK])
+    if call.data[ATTR_WAIT]:
+        try:
+            await future
+        except asyncio.TimeoutError as err:
+            raise HomeAssistantError(f"Node {mac} did not acknowledge the command") from err
+
+
 async def options_update_listener(
     hass: core.HomeAssistant, config_entry: config_entries.ConfigEntry
 ):
@@ -59,14 +164,15 @@ async def async_unload_entry(
 ) -> bool:
     """Unload a config entry."""
     _LOGGER.info("Unload Config Entry: {}".format(config_entry.entry_id))
-    unload_ok = all(
-        await asyncio.gather(
-            *[hass.config_entries.async_forward_entry_unload(config_entry, "sensor")]
-        )
-    )
+    unload_ok = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
     # Remove options_update_listener.
     hass.data[DOMAIN][config_entry.entry_id]["unsub_options_update_listener"]()
 
+    for bridge in list(EspNowBridge.bridges):
+        if bridge.config_entry.entry_id == config_entry.entry_id:
+            bridge.stop()
+            await bridge.waitStopped()
+
     # Remove config config_entry from domain.
     if unload_ok:
         hass.data[DOMAIN].pop(config_entry.entry_id)
@@ -86,7 +192,7 @@ class EspNowBridge:
     nodes = {}
     nodes_by_device_id = {}
 
-    def __init__(self, hass, config_entry, store, store_data):
+    def __init__(self, hass, config_entry, store, store_data, capture=None):
         self.config_entry = config_entry
         self.config = dict(config_entry.data)
         self.nodes = {}
@@ -105,10 +211,40 @@ class EspNowBridge:
         if not self.config.get(CONF_SERIAL_PORT):
             raise ValueError(CONF_SERIAL_PORT + " must be set")
         hass.data[DOMAIN][config_entry.entry_id] = self.config
+        hass.data.setdefault(DATA_BRIDGES, {})[config_entry.entry_id] = self
+
+        # Entities waiting for their platform, added in one batch per loop
+        # iteration.
+        self._add_entities = {}
+        self._pending_entities = {}
+        self._add_scheduled = False
+        self._discovered = {}
+        self.entity_add_latency = LatencyHistogram()
+        self.entity_batches = 0
+
+        # Registry entries of this config entry by unique id, so sensors can be
+        # re-bound without guessing entity ids.
+        self.entity_index = {}
+        self._entity_keys = {}
+        for e in entity_registry.async_entries_for_config_entry(self.entity_registry, config_entry.entry_id):
+            self.indexEntity(e)
+        self._unsub_entity_registry = hass.bus.async_listen(
+            entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self.entityRegistryUpdated)
 
+        self.stats = BridgeStats() if self.config.get(CONF_STATS) else None
+        self._log_sample = self.config.get(CONF_LOG_SAMPLE, DEFAULT_LOG_SAMPLE)
+        self._log_count = 0
+        self.wheel = TimerWheel(time.monotonic(), WHEEL_INTERVAL.total_seconds())
+
+        # JSON of every node as last written to the store, embedded as is by
+        # the store's encoder. Only nodes marked dirty are encoded again.
+        self._saved_nodes = {}
         if store_data:
             for mac, n in store_data.get("nodes", {}).items():
-                Node(self, mac, n.get("name"), triggers=n.get("triggers"), events=n.get("events"))
+                self._saved_nodes[mac] = json_fragment(json_bytes(n))
+        self._dirty_nodes = set()
+        self.save_stats = {"saves": 0, "serialized_nodes": 0, "last_save_time": None}
+        self.restoreNodes(store_data)
 
         # Registers update listener to update config entry when options are updated.
         unsub_options_update_listener = config_entry.add_update_listener(options_update_listener)
@@ -116,15 +252,260 @@ class EspNowBridge:
         # Store a reference to the unsubscribe function to cleanup if an entry is unloaded.
         self.config["unsub_options_update_listener"] = unsub_options_update_listener
 
-        self._task = self.hass.loop.create_task(self.serialReaderTask())
+        self._max_batch = self.config.get(CONF_MAX_BATCH, DEFAULT_MAX_BATCH)
+        self._ingest = IngestQueue(self.config.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE))
+        self._dispatch_scheduled = False
+        self.event_latency = {}
+
+        # Several dongles can feed one node table, messages heard by more than
+        # one of them are only processed once.
+        self.serial_ports = [p.strip() for p in self.config[CONF_SERIAL_PORT].split(",") if p.strip()]
+        self.port_stats = {port: {"messages": 0, "duplicates": 0} for port in self.serial_ports}
+        self.node_ports = {}
+        self._dedup = None
+        if len(self.serial_ports) > 1:
+            self._dedup = Deduplicator(self.config.get(CONF_DEDUP_WINDOW, DEFAULT_DEDUP_WINDOW))
+
+        # Unknown MACs wait here until they may become nodes, so foreign or
+        # MAC cycling traffic can not flood the registries.
+        self.admission = AdmissionControl(
+            self.config.get(CONF_ALLOW_MACS),
+            self.config.get(CONF_DENY_MACS),
+            self.config.get(CONF_ONBOARD_RATE, DEFAULT_ONBOARD_RATE))
+
+        # Optional raw capture of all received frames, see capture.py
+        self.capture = capture
+
+        self._tasks = []
+        self._reader_threads = []
+        self._writers = {}
+        for port in self.serial_ports:
+            if self.config.get(CONF_IO_THREAD):
+                thread = SerialReaderThread(
+                    self.hass.loop,
+                    port,
+                    self.config.get(CONF_BAUD, 460800),
+                    self.handleMessages,
+                    self._max_batch,
+                    self.stats)
+                thread.start()
+                self._reader_threads.append(thread)
+            else:
+                self._tasks.append(self.hass.loop.create_task(self.serialReaderTask(port)))
+
+        self.commands = CommandSender(
+            self.hass.loop,
+            self.writeSerial,
+            self.config.get(CONF_TX_RATE, DEFAULT_TX_RATE),
+            self.config.get(CONF_ACK_TIMEOUT, DEFAULT_ACK_TIMEOUT),
+            self.config.get(CONF_RETRIES, DEFAULT_RETRIES))
+        self._tasks.append(self.hass.loop.create_task(self.commands.run()))
         self.bridges.append(self)
 
+        self.offline_factor = self.config.get(CONF_OFFLINE_FACTOR, DEFAULT_OFFLINE_FACTOR)
+        self.offline_min_timeout = self.config.get(CONF_OFFLINE_MIN_TIMEOUT, DEFAULT_OFFLINE_MIN_TIMEOUT)
+        self._unsub_wheel = async_track_time_interval(self.hass, self.tickWheel, WHEEL_INTERVAL)
+
+        self.stat_sensors = []
+        self._unsub_stats = None
+        if self.stats:
+            self.setupStatSensors()
+
+    def restoreNodes(self, store_data):
+        """Rebuild the node table and sensor bindings from the store and registries.
+
+        Device and entity entries of the config entry are read in one pass each,
+        nodes whose device entry is unchanged do not write to the registry.
+        """
+        start = time.monotonic()
+        devices = {}
+        for d in device_registry.async_entries_for_config_entry(self.device_registry, self.config_entry.entry_id):
+            for domain, mac in d.identifiers:
+                if domain == DOMAIN and not mac.startswith("bridge_"):
+                    devices[mac] = d
+        if store_data:
+            for mac, n in store_data.get("nodes", {}).items():
+                Node(self, mac, n.get("name"), triggers=n.get("triggers"), events=n.get("events"),
+                     options=n.get("options"), aliases=n.get("aliases"), delta=n.get("delta", False),
+                     device_entry=devices.pop(mac, None))
+        for mac, d in devices.items():
+            Node(self, mac, d.name, device_entry=d)
+
+        sensors = 0
+        for e in list(self.entity_index.values()):
+            node = self.nodes_by_device_id.get(e.device_id)
+            if node is None or node.bridge is not self or not e.original_name:
+                continue
+            prefix = node.name + " "
+            if not e.original_name.startswith(prefix):
+                continue
+            name = e.original_name[len(prefix):]
+            if name not in node.sensors and node.sensorUniqueId(name) == e.unique_id:
+                node.bindSensor(name, e)
+                sensors += 1
+        self.startup_time = round(time.monotonic() - start, 6)
+        _LOGGER.info("Restored {} nodes and {} sensors in {:.3f}s".format(len(self.nodes), sensors, self.startup_time))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for thread in self._reader_threads:
+            thread.stop()
+        if self._unsub_stats:
+            self._unsub_stats()
+        self._unsub_wheel()
+        self._unsub_entity_registry()
+        for node in self.nodes.values():
+            node.cancelPressFilters()
+        if self.capture:
+            capture, self.capture = self.capture, None
+            self.hass.async_add_executor_job(capture.close)
+        self.hass.data[DATA_BRIDGES].pop(self.config_entry.entry_id, None)
+        self.bridges.remove(self)
+
+    async def waitStopped(self):
+        """Wait until the readers of a stopped bridge have closed their ports.
+
+        A reloaded entry opens the same ports again right after.
+        """
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for thread in self._reader_threads:
+            await self.hass.async_add_executor_job(thread.join)
+
+    @callback
+    def setupPlatform(self, domain, async_add_entities):
+        self._add_entities[domain] = async_add_entities
+        self.scheduleAddEntities()
+
+    def addEntity(self, domain, entity):
+        """Queue a new entity for its platform."""
+        self._pending_entities.setdefault(domain, []).append(entity)
+        self._discovered[entity.unique_id] = time.monotonic()
+        self.scheduleAddEntities()
+
+    def scheduleAddEntities(self):
+        if not self._add_scheduled and self._pending_entities:
+            self._add_scheduled = True
+            self.hass.loop.call_soon(self.addPendingEntities)
+
+    @callback
+    def addPendingEntities(self):
+        self._add_scheduled = False
+        for domain in list(self._pending_entities):
+            add_entities = self._add_entities.get(domain)
+            if add_entities is None:
+                # Platform not set up yet, it adds them when it is.
+                continue
+            entities = self._pending_entities.pop(domain)
+            self.entity_batches += 1
+            _LOGGER.info("Adding {} {} entities".format(len(entities), domain))
+            add_entities(entities)
+
+    @callback
+    def entityAdded(self, entity):
+        discovered = self._discovered.pop(entity.unique_id, None)
+        if discovered is not None:
+            self.entity_add_latency.record(time.monotonic() - discovered)
+
+    def sendCommand(self, mac, payload, ack=True):
+        """Queue a command for a node, returns a future resolved by its ack."""
+        port = self.node_ports.get(mac, self.serial_ports[0])
+        return self.commands.send(mac, payload, port, ack)
+
+    async def writeSerial(self, port, data):
+        for thread in self._reader_threads:
+            if thread.url == port:
+                await self.hass.async_add_executor_job(thread.write, data)
+                return
+        writer = self._writers.get(port)
+        if writer is None:
+            raise SerialException(f"Serial device {port} is not connected")
+        writer.write(data)
+        await writer.drain()
+
+    @callback
+    def tickWheel(self, now=None):
+        now = time.monotonic()
+        self.wheel.advance(now)
+        if len(self.admission):
+            self.onboardNodes(now)
+
+    def onboardNodes(self, now):
+        """Create the nodes admission control lets through and replay their messages."""
+        for mac, messages in self.admission.take(now):
+            name = next((msg["name"] for msg, _ in messages if msg.get("name")), None)
+            Node(self, mac, name)
+            if self.stats:
+                self.stats.unknown_macs += 1
+            for msg, _ in messages:
+                self.dispatchMessage(msg)
 
-    async def serialReaderTask(self):
-        serial_port = self.config[CONF_SERIAL_PORT];
+    def setupStatSensors(self):
+        self.device_entry = self.device_registry.async_get_or_create(
+            config_entry_id=self.config_entry.entry_id,
+            identifiers={(DOMAIN, "bridge_" + self.config_entry.entry_id)},
+            name="ESP-NOW Bridge",
+            manufacturer="Espressive",
+            model="ESP-NOW Bridge",
+        )
+        self.device_id = self.device_entry.id
+        self.stat_sensors = [EspNowBridgeSensor(self, *s) for s in BRIDGE_SENSORS]
+        self._unsub_stats = async_track_time_interval(self.hass, self.updateStatSensors, STATS_INTERVAL)
+
+    @callback
+    def updateStatSensors(self, now=None):
+        self.stats.updateRate()
+        values = self.stats.asdict()
+        values.update(self.ingestStats())
+        values["suppressed_writes"] = self.suppressedWrites()
+        for s in self.stat_sensors:
+            s.setValue(values)
+
+    def ingestStats(self):
+        return {
+            "queue_depth": len(self._ingest),
+            "queue_high_water": self._ingest.high_water,
+            "queue_merged": self._ingest.merged,
+            "queue_dropped": self._ingest.dropped,
+        }
+
+    def portStats(self):
+        ports = {}
+        for port, counts in self.port_stats.items():
+            total = counts["messages"]
+            ports[port] = {**counts, "duplicate_rate": round(counts["duplicates"] / total, 4) if total else None}
+        return ports
+
+    def diagnostics(self):
+        return {
+            "config": {k: v for k, v in self.config.items() if not callable(v)},
+            "nodes": len(self.nodes),
+            "startup_time": self.startup_time,
+            "stats": self.stats.asdict() if self.stats else None,
+            "ingest": self.ingestStats(),
+            "ports": self.portStats(),
+            "commands": self.commands.asdict(),
+            "admission": self.admission.asdict(),
+            "suppressed_writes": self.suppressedWrites(),
+            "sequence_gaps": sum(node.sq_gaps for node in self.nodes.values()),
+            "suppressed_events": sum(f.suppressed for node in self.nodes.values() for f in node._press_filters.values()),
+            "event_latency": {t: h.asdict() for t, h in self.event_latency.items()},
+            "entities": {
+                "batches": self.entity_batches,
+                "pending": sum(len(e) for e in self._pending_entities.values()),
+                "add_latency": self.entity_add_latency.asdict(),
+            },
+            "storage": dict(self.save_stats, dirty_nodes=len(self._dirty_nodes)),
+        }
+
+
+    async def serialReaderTask(self, serial_port):
+        splitter = FrameSplitter()
+        logged_error = False
+        connected = False
         while True:
             try:
-                reader, _ = await serial_asyncio.open_serial_connection(
+                reader, writer = await serial_asyncio.open_serial_connection(
                     url=serial_port, baudrate=self.config.get(CONF_BAUD, 460800))
 
             except SerialException as exc:
@@ -134,17 +515,33 @@ class EspNowBridge:
                 await self._handleError()
             else:
                 _LOGGER.warning("Serial device %s connected", serial_port)
-                while True:
-                    try:
-                        line = await reader.readline()
-                    except SerialException as exc:
-                        _LOGGER.exception("Error while reading serial device %s: %s", serial_port, exc)
-                        await self._handleError()
-                        break
-                    else:
-                        line = line.decode("utf-8").strip()
-                        _LOGGER.warning("Received: %s", line)
-                        self.handleMessage(line)
+                logged_error = False
+                if self.stats and connected:
+                    self.stats.reconnects += 1
+                connected = True
+                splitter.reset()
+                self._writers[serial_port] = writer
+                try:
+                    while True:
+                        try:
+                            chunk = await reader.read(READ_CHUNK_SIZE)
+                        except SerialException as exc:
+                            _LOGGER.exception("Error while reading serial device %s: %s", serial_port, exc)
+                            break
+                        if not chunk:
+                            _LOGGER.error("Serial device %s closed", serial_port)
+                            break
+                        received = time.monotonic()
+                        frames = splitter.feed(chunk)
+                        if self.stats:
+                            self.stats.addTime("read", time.monotonic() - received)
+                            self.stats.bytes += len(chunk)
+                        self.handleFrames(frames, received, serial_port)
+                finally:
+                    # Also when the bridge is stopped, so the port is released.
+                    self._writers.pop(serial_port, None)
+                    writer.close()
+                await self._handleError()
 
 
     async def _handleError(self):
@@ -152,44 +549,219 @@ class EspNowBridge:
             await asyncio.sleep(1)
 
 
-    def handleMessage(self, data):
-        if data[0] != '{':
-            return
+    def handleFrames(self, frames, received, port):
+        if self._log_sample and _LOGGER.isEnabledFor(logging.DEBUG):
+            self.logSample(frames)
+        stats = self.stats
+        if stats:
+            start = time.monotonic()
+            stats.frames += len(frames)
+        count = 0
+        capture = self.capture
+        for frame in frames:
+            msg = parseFrame(frame, stats)
+            if capture:
+                capture.append(frame, msg.get("MAC") if isinstance(msg, dict) else None, received)
+            if msg is not None:
+                count += 1
+                self.enqueueFrame(msg, received, port)
+        self.port_stats[port]["messages"] += count
+        if stats:
+            stats.addTime("decode", time.monotonic() - start)
+        self.scheduleDispatch()
+
+    @callback
+    def handleMessages(self, items, received, port):
+        """Queue a batch of (message, frame) pairs decoded by a reader thread.
+
+        message is None for frames that could not be parsed, they are only
+        captured.
+        """
+        if self._log_sample and _LOGGER.isEnabledFor(logging.DEBUG):
+            self.logSample([msg for msg, _ in items if msg is not None])
+        count = 0
+        capture = self.capture
+        for msg, frame in items:
+            if capture:
+                capture.append(frame, msg.get("MAC") if isinstance(msg, dict) else None, received)
+            if msg is not None:
+                count += 1
+                self.enqueueFrame(msg, received, port)
+        self.port_stats[port]["messages"] += count
+        self.scheduleDispatch()
+
+    def logSample(self, items):
+        """Log every n-th received frame."""
+        for item in items:
+            self._log_count += 1
+            if self._log_count >= self._log_sample:
+                self._log_count = 0
+                _LOGGER.debug("Received: %s", item)
+
+    def enqueueFrame(self, msg, received, port):
+        # The reader keeps going whatever a single message contains.
         try:
-            msg = json.loads(data)
+            self.enqueueMessage(msg, received, port)
         except Exception as ex:
-            _LOGGER.exception('Received invalid JSON: "{}" | {} | {}'.format(data, ex, traceback.format_exc()))
-            return
+            _LOGGER.exception("Failed to queue message: {} | {} | {}".format(msg, ex, traceback.format_exc()))
+
+    def enqueueMessage(self, msg, received, port=None):
+        if self._dedup is not None:
+            mac = msg.get("MAC")
+            key = dedupKey(msg)
+            if key is not None and self._dedup.isDuplicate(key, received):
+                self.port_stats[port]["duplicates"] += 1
+                return
+            self.node_ports[mac] = port
+        node = self.nodes.get(msg.get("MAC"))
+        if node is not None and ("sq" in msg or "ts" in msg or "rssi" in msg):
+            # Before the queue may merge messages, so every received frame counts.
+            values = node.link.update(msg.get("sq"), msg.get("ts"), msg.get("rssi"), received)
+            if values:
+                node.updateLinkSensors(values)
+            sq = msg.get("sq")
+            if isinstance(sq, int) and not isinstance(sq, bool):
+                node.checkSequence(sq, msg.get("full"), received)
+        if node is not None:
+            # Fire the events right away instead of behind queued telemetry.
+            # Messages with config keep theirs until they are dispatched, the
+            # node's later events then wait behind them to stay in order.
+            events = node.takeEvents(msg) if not node._queued_events else None
+            if events:
+                node.fireEvents(events, received)
+            elif events is None and hasEvents(msg):
+                node._queued_events += 1
+        self._ingest.put(msg, received)
+
+    def scheduleDispatch(self):
+        if not self._dispatch_scheduled and len(self._ingest):
+            self._dispatch_scheduled = True
+            self.hass.loop.call_soon(self.dispatchQueued)
+
+    @callback
+    def dispatchQueued(self):
+        # One batch per loop iteration, so the reader keeps up while we catch up.
+        self._dispatch_scheduled = False
+        batch = self._ingest.get(self._max_batch)
+        if self.stats:
+            start = time.monotonic()
+            self.stats.messages += len(batch)
+        for msg, received in batch:
+            self.dispatchMessage(msg, received)
+        if self.stats:
+            self.stats.addTime("dispatch", time.monotonic() - start)
+        self.scheduleDispatch()
+
+    def recordEventLatency(self, ev_type, latency):
+        hist = self.event_latency.get(ev_type)
+        if hist is None:
+            hist = self.event_latency[ev_type] = LatencyHistogram()
+        hist.record(latency)
+
+    async def replayCapture(self, path, speed=1.0, **kwargs):
+        """Feed a capture file through handleMessage, see capture.replay."""
+        return await replay(path, self.handleMessage, speed, **kwargs)
+
+    def handleMessage(self, data):
+        msg = parseFrame(data)
+        if msg is not None:
+            self.dispatchMessage(msg)
 
+    def dispatchMessage(self, msg, received=None):
         try:
             mac = msg.get("MAC")
             if not mac:
-                _LOGGER.error("Message has no MAC address: {}".format(data))
+                _LOGGER.error("Message has no MAC address: {}".format(msg))
                 return
+            if "ack" in msg:
+                self.commands.acknowledge(msg["ack"])
             node = self.nodes.get(mac)
             if not node:
-                node = Node(self, mac, msg.get("name"))
-            node.updateSensors(msg)
+                self.admission.park(mac, msg, received)
+                return
+            if "ri" in msg:
+                node.report_interval = float(msg["ri"]) if msg["ri"] else None
+            node.seen(time.monotonic())
+            if node._queued_events and hasEvents(msg):
+                node._queued_events -= 1
+            node.updateSensors(msg, received)
         except Exception as ex:
-            _LOGGER.exception("Failed to handle message: {} | {} | {}".format(data, ex, traceback.format_exc()))
+            _LOGGER.exception("Failed to handle message: {} | {} | {}".format(msg, ex, traceback.format_exc()))
 
     
+    def indexEntity(self, entry):
+        self.entity_index[entry.unique_id] = entry
+        self._entity_keys[entry.entity_id] = entry.unique_id
+
+    @callback
+    def entityRegistryUpdated(self, event):
+        entity_id = event.data.get("entity_id")
+        unique_id = self._entity_keys.pop(event.data.get("old_entity_id", entity_id), None)
+        if unique_id:
+            self.entity_index.pop(unique_id, None)
+        if event.data.get("action") == "remove":
+            return
+        entry = self.entity_registry.async_get(entity_id)
+        if not entry or entry.config_entry_id != self.config_entry.entry_id:
+            return
+        self.indexEntity(entry)
+        node = self.nodes_by_device_id.get(entry.device_id)
+        if node:
+            node.forgetMissingSensors()
+        else:
+            for node in self.nodes.values():
+                node.forgetMissingSensors()
+
+    def writeState(self, entity):
+        if entity.platform is None:
+            # Not added yet, the platform writes the current state when it is.
+            return
+        if self.stats is None:
+            entity.async_write_ha_state()
+            return
+        start = time.monotonic()
+        entity.async_write_ha_state()
+        self.stats.addTime("state_write", time.monotonic() - start)
+
+    def suppressedWrites(self):
+        return sum(s.suppressed_writes for node in self.nodes.values() for s in node.sensors.values())
+
     def addNode(self, node):
         self.nodes[node.mac] = node
         self.nodes_by_device_id[node.device_id] = node
 
     @callback
-    def save_config(self):
-        nc = {}
-        for mac, node in self.nodes.items():
-            nc[mac] = node.asdict()
-        data = {"nodes": nc}
-        _LOGGER.info(f"Save Config: {data}")
-        self._store.async_delay_save(lambda: data, 1.0)
+    def save_config(self, node=None):
+        """Schedule a store write for a changed node, or for all nodes if node is None."""
+        if node is None:
+            self._dirty_nodes.update(self.nodes)
+        else:
+            self._dirty_nodes.add(node.mac)
+        # Repeated calls within the delay end up in one write.
+        self._store.async_delay_save(self._storeData, SAVE_DELAY)
+
+    @callback
+    def _storeData(self):
+        start = time.monotonic()
+        dirty = self._dirty_nodes
+        for mac in dirty:
+            node = self.nodes.get(mac)
+            if node:
+                self._saved_nodes[mac] = json_fragment(json_bytes(node.asdict()))
+        _LOGGER.info("Save Config: {} of {} nodes changed".format(len(dirty), len(self._saved_nodes)))
+        self.save_stats["saves"] += 1
+        self.save_stats["serialized_nodes"] += len(dirty)
+        self._dirty_nodes = set()
+        # Fragments do not change, a copy of the map is a snapshot even if the
+        # store encodes it later.
+        data = {"nodes": dict(self._saved_nodes)}
+        self.save_stats["last_save_time"] = round(time.monotonic() - start, 6)
+        return data
 
 
 class Node(Entity):    
-    def __init__(self, bridge, mac, name, triggers=None, events=None):
+    def __init__(self, bridge, mac, name, triggers=None, events=None, options=None, aliases=None, delta=False,
+                 device_entry=None):
         super().__init__()
         self.hass = bridge.hass        
         self.bridge = bridge
@@ -198,22 +770,46 @@ class Node(Entity):
         self.config_entry = bridge.config_entry
         self.device_automation_triggers = triggers if triggers else {}
         self.events = events if events else {}
+        self.trigger_options = options if options else {}
+        self._press_filters = {}
+        # Short message key -> sensor name, "@" keys -> event name
+        self.aliases = aliases if aliases else {}
+        self.last_sq = None
+        self.sq_gaps = 0
+        # Sends only changed values and marks complete reports with "full",
+        # only such nodes are asked to resync.
+        self.delta = delta
+        self.link = LinkStats()
+        self.link_sensors = {}
+        self._resync_requested = None
+        # Queued messages whose events are fired when they are dispatched
+        self._queued_events = 0
         self._updated = False
+        self._plans = {}
+        self._missing_sensors = set()
+        self.report_interval = None
+        self.last_seen = None
+        self._learned_interval = None
+        self._wheel_scheduled = False
         if not name:
             name = "ESPNOW-" + mac
 
         self._attr_name = name
 
-        self.device_entry = self.bridge.device_registry.async_get_or_create(
-            config_entry_id=self.config_entry.entry_id,
-            configuration_url="https://github.com/avenhaus",
-            identifiers={(DOMAIN, self.mac)},
-            name=name,
-            manufacturer="Espressive",
-            model="ESP32",
-            sw_version="0.1",
-            hw_version="0.1",
-        )
+        if device_entry is not None and device_entry.name == name:
+            # Restored at startup and unchanged, skip the registry write.
+            self.device_entry = device_entry
+        else:
+            self.device_entry = self.bridge.device_registry.async_get_or_create(
+                config_entry_id=self.config_entry.entry_id,
+                configuration_url="https://github.com/avenhaus",
+                identifiers={(DOMAIN, self.mac)},
+                name=name,
+                manufacturer="Espressive",
+                model="ESP32",
+                sw_version="0.1",
+                hw_version="0.1",
+            )
         self.device_id = self.device_entry.id
         self._attr_unique_id = "device.esp_now_" + self.device_id
         bridge.addNode(self)
@@ -221,8 +817,103 @@ class Node(Entity):
 
         _LOGGER.info("New node:{} name:{} device_id:{} unique_id:{}".format(mac, name, self.device_id, self._attr_unique_id))
 
+    def seen(self, now):
+        if self.last_seen is not None:
+            gap = now - self.last_seen
+            if gap >= BURST_GAP:
+                # Decaying maximum of the gaps between bursts. An average would
+                # be pulled down by nodes sending several messages per report.
+                if self._learned_interval is None or gap > self._learned_interval:
+                    self._learned_interval = gap
+                else:
+                    self._learned_interval += (gap - self._learned_interval) / 16
+        self.last_seen = now
+        if not self._attr_available:
+            self.setAvailable(True)
+        if not self._wheel_scheduled:
+            timeout = self.offlineTimeout()
+            if timeout is not None:
+                self.bridge.wheel.schedule(self, now + timeout)
+                self._wheel_scheduled = True
+
+    def offlineTimeout(self):
+        """Seconds of silence after which the node is unavailable."""
+        interval = self.report_interval or self._learned_interval
+        if interval is None:
+            return None
+        return max(interval * self.bridge.offline_factor, self.bridge.offline_min_timeout)
+
+    def onTimer(self, now):
+        timeout = self.offlineTimeout()
+        if timeout is not None:
+            deadline = self.last_seen + timeout
+            if deadline > now:
+                return deadline
+            _LOGGER.info("Node {} not seen for {:.0f}s, marking unavailable".format(self.name, now - self.last_seen))
+            self.setAvailable(False)
+        self._wheel_scheduled = False
+        return None
+
+    def setAvailable(self, available):
+        self._attr_available = available
+        for s in self.sensors.values():
+            s.setAvailable(available)
+        for s in self.link_sensors.values():
+            self.bridge.writeState(s)
+
+    def updateLinkSensors(self, values):
+        for key, value in values.items():
+            s = self.link_sensors.get(key)
+            if s is None:
+                if value is None:
+                    continue
+                s = self.link_sensors[key] = EspNowLinkSensor(self, key)
+            s.setValue(values)
+
+    def checkSequence(self, sq, full, now):
+        """Request all values from a delta node if messages were lost.
+
+        Delta nodes only send changed values, so a lost message leaves sensors
+        stale until they change again. Nodes sending all values every time
+        just recover with their next message.
+        """
+        last = self.last_sq
+        if full or last is None or sq == 0:
+            # Full update, first message or node restarted
+            self.last_sq = sq
+            if full:
+                self._resync_requested = None
+                if not self.delta:
+                    self.delta = True
+                    self.bridge.save_config(self)
+            return
+        ahead = (sq - last) % SEQUENCE_MODULO
+        if ahead == 0 or ahead >= SEQUENCE_MODULO // 2:
+            if SEQUENCE_MODULO - ahead >= REORDER_WINDOW:
+                # Too far back to be late, the node started over.
+                self.last_sq = sq
+            # Otherwise a duplicate, or an old message arriving late
+            return
+        self.last_sq = sq
+        gap = ahead - 1
+        if gap == 0:
+            return
+        self.sq_gaps += 1
+        if not self.delta:
+            return
+        if self._resync_requested is not None and now - self._resync_requested < RESYNC_TIMEOUT:
+            return
+        _LOGGER.info("Node {} missed {} messages, requesting resync".format(self.name, gap))
+        self._resync_requested = now
+        self.bridge.sendCommand(self.mac, RESYNC_COMMAND, ack=False)
+
+    def setAlias(self, key, name):
+        if self.aliases.get(key) != name:
+            self.aliases[key] = name
+            self._updated = True
+
     def asdict(self):
-        return {"name": self._attr_name, "device_id":self.device_id, "triggers": self.device_automation_triggers, "events": self.events}
+        return {"name": self._attr_name, "device_id":self.device_id, "triggers": self.device_automation_triggers, "events": self.events, "options": self.trigger_options, "aliases": self.aliases, "delta": self.delta}
 
     def addSensor(self, name, config):
         _LOGGER.info("Found sensor: {}".format(name))
@@ -237,14 +928,124 @@ class Node(Entity):
             self.sensors[name] = s
         return s
     
-    def updateSensors(self, msg, path=None):
+    def updateSensors(self, msg, received=None):
+        # Nodes keep sending the same message layout, so the walk over the keys
+        # is done once per layout and cached as flat lists of leaf handlers.
+        shape = self.messageShape(msg)
+        plan = self._plans.get(shape)
+        if plan is None:
+            leaves = self.compilePlan(msg)
+            if leaves is None:
+                self.walkMessage(msg)
+                return
+            plan = ([(keys, event) for keys, s, event in leaves if s is None],
+                    [(keys, s) for keys, s, event in leaves if s is not None])
+            if len(self._plans) >= MAX_MESSAGE_PLANS:
+                self._plans.clear()
+            self._plans[shape] = plan
+        event_leaves, sensor_leaves = plan
+        # Events first, button presses should not wait for sensor state writes.
+        if event_leaves:
+            events = {}
+            for keys, event in event_leaves:
+                value = msg
+                for key in keys:
+                    value = value[key]
+                events[event] = value
+            self.fireEvents(events, received)
+        for keys, s in sensor_leaves:
+            value = msg
+            for key in keys:
+                value = value[key]
+            if value != "not_found":
+                s.handleNewValue(value)
+
+    def takeEvents(self, msg):
+        """Remove the "@" events from a message and return them.
+
+        Messages with "$" or "^" config are left alone and return None, their
+        events depend on the trigger config in the same message.
+        """
+        found = []
+        if not self._findEvents(msg, None, found):
+            return None
         events = {}
+        for container, key, name in found:
+            events[name] = container.pop(key)
+        return events
+
+    def _findEvents(self, msg, path, found):
+        for key, value in msg.items():
+            prefix = key[:1]
+            if prefix == "@":
+                if not path and key in self.aliases:
+                    found.append((msg, key, self.aliases[key]))
+                    continue
+                found.append((msg, key, path + " " + key[1:] if path else key[1:]))
+            elif prefix == "^" or prefix == "$":
+                return False
+            elif isinstance(value, dict):
+                if not self._findEvents(value, path + " " + key if path else key, found):
+                    return False
+        return True
+
+    @staticmethod
+    def messageShape(msg):
+        return tuple((key, Node.messageShape(value)) if isinstance(value, dict) else key for key, value in msg.items())
+
+    def compilePlan(self, msg, keys=(), path=None, plan=None):
+        """Map every leaf of a message to its sensor or event name.
+
+        Returns None if the message carries "$" or "^" configuration.
+        """
+        if plan is None:
+            plan = []
         for key, value in msg.items():
+            if not path:
+                if key in NODE_KEYS or (key in LINK_KEYS and "sq" in msg):
+                    continue
+                alias = self.aliases.get(key)
+                if alias is not None and not isinstance(value, dict):
+                    if key[:1] == "@":
+                        plan.append(((key,), None, alias))
+                    else:
+                        s = self.sensors.get(alias) or self.sensorFromEntity(alias)
+                        if s:
+                            plan.append(((key,), s, None))
+                    continue
+            prefix = key[:1]
+            if prefix == "^" or prefix == "$":
+                return None
+            leaf_keys = keys + (key,)
+            if prefix == "@":
+                plan.append((leaf_keys, None, path + " " + key[1:] if path else key[1:]))
+                continue
             name = path + " " + key if path else key
-            if not path and key == "MAC":
-                pass
-            elif not path and key == "name":
+            if isinstance(value, dict):
+                if self.compilePlan(value, leaf_keys, name, plan) is None:
+                    return None
+            elif key != "not_found":
+                s = self.sensors.get(name)
+                if not s:
+                    s = self.sensorFromEntity(name)
+                if s:
+                    plan.append((leaf_keys, s, None))
+        return plan
+
+    def walkMessage(self, msg, path=None):
+        events = {}
+        for key, value in msg.items():
+            name = path + " " + key if path else key
+            if not path and (key in NODE_KEYS or (key in LINK_KEYS and "sq" in msg)):
                 pass
+            elif not path and key in self.aliases and not isinstance(value, dict):
+                alias = self.aliases[key]
+                if key[0] == "@":
+                    events[alias] = value
+                else:
+                    s = self.sensors.get(alias) or self.sensorFromEntity(alias)
+                    if s:
+                        s.handleNewValue(value)
             elif key[0] == "^":
                 name = path + " " + key[1:] if path else key[1:]
                 self.configureDeviceAutomationTrigger(name, value)
@@ -255,7 +1056,7 @@ class Node(Entity):
                 name = path + " " + key[1:] if path else key[1:]
                 self.configureSensor(name, value)
             elif isinstance(value, dict):                
-                self.updateSensors(value, name)
+                self.walkMessage(value, name)
             else:
                 if key == "not_found":
                     continue
@@ -271,34 +1072,56 @@ class Node(Entity):
             self.fireEvents(events)
         if self._updated:
             self._updated = False
-            self.bridge.save_config()
+            self.bridge.save_config(self)
+
+    def sensorUniqueId(self, name):
+        return self.mac + "_" + (self.name + " " + name).lower().replace(" ", "_").replace("-", "_")
 
     def sensorFromEntity(self, name):
+        if name in self._missing_sensors:
+            return None
         s = None
-        eid = EspNowSensor.makeId(self, name)
-        e = self.bridge.entity_registry.async_get(eid)
-        # _LOGGER.debug("SFR Registy {} {}: {}".format(name, eid, e))
+        e = self.bridge.entity_index.get(self.sensorUniqueId(name))
         if e:
-            s = EspNowSensor(self, name, entity=e)
+            s = self.bindSensor(name, e)
         else:
-            eid = EspNowBinarySensor.makeId(self, name)
-            e = self.bridge.entity_registry.async_get(eid)
-            # _LOGGER.debug("SFR Registy {} {}: {}".format(name, eid, e))
-            if e:
-                s = EspNowBinarySensor(self, name, entity=e)
-        if (s):
-            self.sensors[name] = s
+            if len(self._missing_sensors) >= MAX_MISSING_SENSORS:
+                # Plans leave out missing sensors, they have to be looked up again.
+                self._missing_sensors.clear()
+                self._plans.clear()
+            self._missing_sensors.add(name)
+        return s
+
+    def bindSensor(self, name, entry):
+        """Create the sensor for an existing registry entry."""
+        if entry.domain == BINARY_SENSOR_DOMAIN:
+            s = EspNowBinarySensor(self, name, entity=entry)
+        else:
+            s = EspNowSensor(self, name, entity=entry)
+        self.sensors[name] = s
         return s
 
+    def forgetMissingSensors(self):
+        """Called when the entity registry changed, so unknown keys are looked up again."""
+        if self._missing_sensors:
+            self._missing_sensors.clear()
+            self._plans.clear()
+
     def configureSensor(self, name, config):
+        self._plans.clear()
+        if isinstance(config, dict) and "k" in config:
+            config = dict(config)
+            self.setAlias(str(config.pop("k")), name)
         s = self.sensors.get(name)
         if not s:
             s = self.addSensor(name, config)
 
     def configureDeviceAutomationTrigger(self, name, config):
+        self._plans.clear()
         ev_type = name.lower().replace(" ", "_").replace("-", "_")
         ev_key = None
         ev_data = {}
+        options = {}
         if not config:
             ev_key = ev_type
         elif isinstance(config, str):        
@@ -308,13 +1131,29 @@ class Node(Entity):
             et = ev_data.pop("t", ev_type)
             sub = ev_data.pop("s", None)
             ev_key = et + '|' + sub if sub else et
+            if "k" in ev_data:
+                self.setAlias("@" + str(ev_data.pop("k")), name)
+            options = {k: ev_data.pop(k) for k in PRESS_OPTIONS if k in ev_data}
         else:
             raise ValueError(f"Invalid Device Automation Trigger config: {config}")
         _LOGGER.info(f"device_automation_trigger: {ev_key} : {ev_data}")
-        if self.events.get(name) != ev_key or self.device_automation_triggers.get(ev_key) != ev_data:
+        if (self.events.get(name) != ev_key or self.device_automation_triggers.get(ev_key) != ev_data
+                or self.trigger_options.get(ev_key, {}) != options):
             self._updated = True
         self.device_automation_triggers[ev_key] = ev_data
         self.events[name] = ev_key
+        if options:
+            self.trigger_options[ev_key] = options
+        else:
+            self.trigger_options.pop(ev_key, None)
+        f = self._press_filters.pop(name, None)
+        if f:
+            f.cancel()
+
+    def cancelPressFilters(self):
+        for f in self._press_filters.values():
+            f.cancel()
+        self._press_filters.clear()
 
 
     @cached_property
@@ -329,29 +1168,46 @@ class Node(Entity):
         _LOGGER.info("device_automation_triggers: {}".format(triggers))
         return triggers
 
-    def fireEvents(self, events):
+    def fireEvents(self, events, received=None):
         for ev, data in events.items():
-            ev_type = ev.lower().replace(" ", "_").replace("-", "_")
-            event_data = {}
-            event_data[CONF_TYPE] = ev_type
             trigger = self.events.get(ev)
-            if trigger:
-                ev_type, ev_subtype = self.triggerParts(trigger)
-                value = self.device_automation_triggers.get(trigger)
-                event_data[CONF_TYPE] = ev_type
-                if ev_subtype is not None:
-                    event_data["subtype"] = ev_subtype
-                if value:
-                    event_data.update(value)
-            if data is not None:
-                if (isinstance(data, dict)):
-                    event_data.update(data)            
-                else:
-                    event_data["value"] = data
-            event_data["device_id"] = self.device_id
-            event_data["device_name"] = self.device_entry.name
-            _LOGGER.info("Fire Event: {} {}".format(ev, event_data))
-            self.hass.bus.async_fire(DOMAIN + "_event" , event_data)
+            options = self.trigger_options.get(trigger) if trigger else None
+            if options:
+                f = self._press_filters.get(ev)
+                if f is None:
+                    f = self._press_filters[ev] = PressFilter(
+                        self.hass.loop, options,
+                        lambda data, extra, received, ev=ev: self.fireEvent(ev, data, extra, received))
+                f.handle(data, received)
+            else:
+                self.fireEvent(ev, data, None, received)
+
+    def fireEvent(self, ev, data, extra=None, received=None):
+        ev_type = ev.lower().replace(" ", "_").replace("-", "_")
+        event_data = {}
+        event_data[CONF_TYPE] = ev_type
+        trigger = self.events.get(ev)
+        if trigger:
+            ev_type, ev_subtype = self.triggerParts(trigger)
+            value = self.device_automation_triggers.get(trigger)
+            event_data[CONF_TYPE] = ev_type
+            if ev_subtype is not None:
+                event_data["subtype"] = ev_subtype
+            if value:
+                event_data.update(value)
+        if data is not None:
+            if (isinstance(data, dict)):
+                event_data.update(data)            
+            else:
+                event_data["value"] = data
+        if extra:
+            event_data.update(extra)
+        event_data["device_id"] = self.device_id
+        event_data["device_name"] = self.device_entry.name
+        _LOGGER.info("Fire Event: {} {}".format(ev, event_data))
+        self.hass.bus.async_fire(DOMAIN + "_event" , event_data)
+        if received is not None:
+            self.bridge.recordEventLatency(ev_type, time.monotonic() - received)
 
     @staticmethod 
     def triggerParts(trigger):
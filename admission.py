@@ -0,0 +1,123 @@
+"""Admission control for nodes the bridge has not seen before."""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+import logging
+
+_LOGGER = logging.getLogger("espnow")
+
+MAX_PENDING_NODES = 100
+# Newest values kept per pending node
+MAX_PENDING_MESSAGES = 16
+# Messages with a name or "$" / "^" config kept per pending node, they are
+# needed to set the node up and are never replaced by values.
+MAX_PENDING_CONFIG = 16
+
+
+def parseMacList(value):
+    """Comma separated MACs, a trailing * matches a prefix (AA:BB:CC:*)."""
+    if not value:
+        return ()
+    return tuple(m.strip().upper() for m in value.split(",") if m.strip())
+
+
+def carriesConfig(msg):
+    """True for messages with the node name or "$" / "^" config."""
+    return "name" in msg or hasConfig(msg)
+
+
+def hasConfig(msg):
+    for key, value in msg.items():
+        if key[:1] in ("$", "^"):
+            return True
+        if isinstance(value, dict) and hasConfig(value):
+            return True
+    return False
+
+
+def matches(mac, patterns):
+    for pattern in patterns:
+        if pattern.endswith("*"):
+            if mac.startswith(pattern[:-1]):
+                return True
+        elif mac == pattern:
+            return True
+    return False
+
+
+class AdmissionControl:
+    """Allow / deny lists and a rate limit for onboarding new nodes.
+
+    Messages of unknown MACs are parked in a bounded pending queue instead of
+    creating the node in the receive path. Per MAC, config messages are kept
+    apart from the newest values, so a node waiting for its turn does not
+    lose its config. take() hands out the MACs that may be onboarded now, at
+    most rate per minute.
+    """
+
+    def __init__(self, allow=None, deny=None, rate=60, max_pending=MAX_PENDING_NODES):
+        self.allow = parseMacList(allow)
+        self.deny = parseMacList(deny)
+        self.rate = rate
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+        self._tokens = float(rate) if rate else 0.0
+        self._last_refill = None
+        self.rejected = 0
+        self.overflow = 0
+        self.onboarded = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def admitted(self, mac):
+        mac = mac.upper()
+        if self.deny and matches(mac, self.deny):
+            return False
+        return not self.allow or matches(mac, self.allow)
+
+    def park(self, mac, msg, received):
+        """Queue a message of an unknown MAC. Returns False if it was rejected."""
+        pending = self._pending.get(mac)
+        if pending is None:
+            if not self.admitted(mac):
+                self.rejected += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.overflow += 1
+                return False
+            pending = self._pending[mac] = ([], deque(maxlen=MAX_PENDING_MESSAGES))
+            _LOGGER.info("New MAC {} waiting for onboarding".format(mac))
+        config, values = pending
+        if not carriesConfig(msg):
+            values.append((msg, received))
+        elif len(config) < MAX_PENDING_CONFIG:
+            config.append((msg, received))
+        return True
+
+    def take(self, now):
+        """Return (MAC, messages) pairs of the nodes to onboard now, config first."""
+        if not self._pending:
+            return []
+        if not self.rate:
+            count = len(self._pending)
+        else:
+            if self._last_refill is not None:
+                self._tokens = min(float(self.rate), self._tokens + (now - self._last_refill) * self.rate / 60)
+            self._last_refill = now
+            count = min(int(self._tokens), len(self._pending))
+            self._tokens -= count
+        result = []
+        for _ in range(count):
+            mac, (config, values) = self._pending.popitem(last=False)
+            result.append((mac, config + list(values)))
+        self.onboarded += len(result)
+        return result
+
+    def asdict(self):
+        return {
+            "pending": len(self._pending),
+            "rejected": self.rejected,
+            "overflow": self.overflow,
+            "onboarded": self.onboarded,
+        }
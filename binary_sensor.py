@@ -7,51 +7,56 @@ from homeassistant.components.binary_sensor import (
     ENTITY_ID_FORMAT,
 )
 from homeassistant.components.binary_sensor import DOMAIN as BINARY_SENSOR_DOMAIN
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from homeassistant.const import STATE_OFF, STATE_ON
 
-from .const import DOMAIN
+from .const import DOMAIN, DATA_BRIDGES
+from .publish import NO_VALUE, PublishPolicy
 
 import logging
 
 
 _LOGGER = logging.getLogger("espnow")
 
+
+async def async_setup_entry(
+    hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Binary sensors are discovered from node messages, the bridge adds them in batches."""
+    hass.data[DATA_BRIDGES][config_entry.entry_id].setupPlatform(BINARY_SENSOR_DOMAIN, async_add_entities)
+
+
 class EspNowBinarySensor(BinarySensorEntity):
 
+    _attr_should_poll = False
+
     def __init__(self, node, name, unit=None, icon=None, device_class=None, config=None, entity=None):
         self.hass = node.hass
         self._node = node
         self._attr_name = node.name + " " + name
         self._state = None
         self._available = True
+        self._publish = PublishPolicy(node.bridge.config)
+        self._timer = None
         self._attr_device_class = device_class if device_class else None
         self._attr_icon = icon if icon else None
 
+        self._attr_unique_id = node.sensorUniqueId(name)
+
         if entity:
-            self.entity = entity
+            self.entity_id = entity.entity_id
             self.fromEntity(entity)
 
         if config:
             self.configure(config)
 
-        if not entity:
-            self.entity = node.bridge.entity_registry.async_get_or_create(
-                domain=BINARY_SENSOR_DOMAIN,
-                platform=DOMAIN,
-                unique_id=node.mac + "_" + self._attr_name.lower().replace(" ", "_").replace("-", "_"),
-                config_entry=node.config_entry,
-                device_id=node.device_id,
-                original_device_class=self._attr_device_class,
-                original_icon=self._attr_icon,
-                original_name=self._attr_name,
-            )
-
-        self.entity_id =  self.entity.entity_id
-        _LOGGER.info("New Binary Sensor:{} {}".format(self.entity_id, self.entity.unique_id))
+        # Registry entry and state are created by the binary sensor platform.
+        node.bridge.addEntity(BINARY_SENSOR_DOMAIN, self)
+        _LOGGER.info("New Binary Sensor:{} {}".format(self.entity_id, self._attr_unique_id))
 
 
 
@@ -78,8 +83,11 @@ class EspNowBinarySensor(BinarySensorEntity):
 
     @property
     def device_info(self) -> DeviceInfo:
-        _LOGGER.info("Device Info:{}".format(self._node.device_info))
-        return self._node.device_info
+        # The node created its device entry, only link to it.
+        return DeviceInfo(identifiers={(DOMAIN, self._node.mac)})
+
+    async def async_added_to_hass(self) -> None:
+        self._node.bridge.entityAdded(self)
 
     def configure(self, config):
         _LOGGER.info("Sensor:{} got config:{}".format(self._attr_unique_id, config))
@@ -96,9 +104,20 @@ class EspNowBinarySensor(BinarySensorEntity):
                 self._attr_native_unit_of_measurement = value
             elif key == "nv":
                 self._attr_native_value = value
+            elif self._publish.configure(key, value):
+                pass
             else:
                 _LOGGER.warning("Sensor:{} unknown config {}:{}".format(self._attr_unique_id, key, value))
 
+    def setAvailable(self, available):
+        if self._available != available:
+            self._available = available
+            self._node.bridge.writeState(self)
+
+    @property
+    def suppressed_writes(self):
+        return self._publish.suppressed
+
     def fromEntity(self, entity):
         self._attr_device_class = entity.original_device_class
         self.area_id = entity.area_id
@@ -112,7 +131,28 @@ class EspNowBinarySensor(BinarySensorEntity):
 
     def handleNewValue(self, value):
         _LOGGER.debug("{} new value: {}".format(self.name, value))
-        self._state = STATE_ON if value else STATE_OFF
-        self.async_write_ha_state()
+        state = STATE_ON if value else STATE_OFF
+        if not self._publish.accept(state):
+            self.scheduleTimer()
+            return
+        self._state = state
+        self._node.bridge.writeState(self)
+        if self._publish.heartbeat:
+            self.scheduleTimer()
+
+    def scheduleTimer(self):
+        deadline = self._publish.deadline()
+        if deadline is not None and (self._timer is None or deadline < self._timer):
+            self._timer = deadline
+            self._node.bridge.wheel.schedule(self, deadline)
+
+    def onTimer(self, now):
+        """Bridge timer wheel callback, writes held back values and heartbeats."""
+        state = self._publish.due(now)
+        if state is not NO_VALUE:
+            self._state = state
+            self._node.bridge.writeState(self)
+        self._timer = self._publish.deadline()
+        return self._timer
 
 
@@ -0,0 +1,200 @@
+"""Raw frame capture to a fixed size ring file, and replay of captures.
+
+Kept free of Home Assistant imports so captures can be inspected and replayed
+outside of it:
+
+    python capture.py /config/espnow.cap [MAC]
+
+prints the captured frames one per line, e.g. to feed them into a
+pseudo-terminal for load testing.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import mmap
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"ESPNCAP1"
+# magic, data size, head (next write offset), tail (oldest record), records
+HEADER = struct.Struct("<8sQQQQ")
+HEADER_SIZE = 64
+# frame length, timestamp, MAC
+RECORD = struct.Struct("<Id6s")
+WRAP = 0xFFFFFFFF
+NO_MAC = bytes(6)
+
+
+def macBytes(mac):
+    try:
+        return bytes.fromhex(mac.replace(":", "").replace("-", ""))[:6].ljust(6, b"\0")
+    except (AttributeError, ValueError):
+        return NO_MAC
+
+
+def macString(data):
+    return ":".join("{:02X}".format(b) for b in data) if data != NO_MAC else None
+
+
+class CaptureWriter:
+    """Append frames to a memory mapped ring file, overwriting the oldest.
+
+    Timestamps are monotonic receive times shifted to wall clock time when the
+    capture is opened, so they stay ordered within and across sessions.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        exists = os.path.exists(path)
+        self._file = open(path, "r+b" if exists else "w+b")
+        self._file.truncate(HEADER_SIZE + size)
+        self._map = mmap.mmap(self._file.fileno(), HEADER_SIZE + size)
+        magic, data_size, head, tail, count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or data_size != size:
+            # New file or a different size, start over.
+            head = tail = count = 0
+        self.size = size
+        self.head = head
+        self.tail = tail
+        self.count = count
+        self.dropped = 0
+        self._clock = time.time() - time.monotonic()
+        self._writeHeader()
+
+    def _writeHeader(self):
+        HEADER.pack_into(self._map, 0, MAGIC, self.size, self.head, self.tail, self.count)
+
+    def _next(self, offset):
+        """Offset of the record after the one at offset."""
+        length = struct.unpack_from("<I", self._map, HEADER_SIZE + offset)[0]
+        offset += RECORD.size + length
+        if offset + RECORD.size > self.size:
+            return 0
+        if struct.unpack_from("<I", self._map, HEADER_SIZE + offset)[0] == WRAP:
+            return 0
+        return offset
+
+    def _free(self, start, end):
+        """Drop the oldest records until none starts in [start, end)."""
+        while self.count and start <= self.tail < end:
+            self.tail = self._next(self.tail)
+            self.count -= 1
+        if not self.count:
+            self.tail = start
+
+    def append(self, frame, mac=None, received=None):
+        size = RECORD.size + len(frame)
+        if size > self.size:
+            self.dropped += 1
+            return
+        head = self.head
+        if head + size > self.size:
+            # Does not fit before the end, continue at the start.
+            self._free(head, self.size)
+            struct.pack_into("<I", self._map, HEADER_SIZE + head, WRAP)
+            head = 0
+        self._free(head, head + size)
+        if received is None:
+            received = time.monotonic()
+        offset = HEADER_SIZE + head
+        RECORD.pack_into(self._map, offset, len(frame), received + self._clock, macBytes(mac) if mac else NO_MAC)
+        self._map[offset + RECORD.size:offset + size] = frame
+        head += size
+        self.head = 0 if head + RECORD.size > self.size else head
+        self.count += 1
+        self._writeHeader()
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class CaptureReader:
+    """Read a capture file, records are indexed by time and MAC when opened."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._data = f.read()
+        magic, size, head, tail, count = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        self.times = []
+        self.offsets = []
+        self.by_mac = {}
+        offset = tail
+        for i in range(count):
+            length, ts, mac = RECORD.unpack_from(self._data, HEADER_SIZE + offset)
+            if length == WRAP:
+                offset = 0
+                length, ts, mac = RECORD.unpack_from(self._data, HEADER_SIZE + offset)
+            self.times.append(ts)
+            self.offsets.append(offset)
+            self.by_mac.setdefault(mac, []).append(i)
+            offset += RECORD.size + length
+            if offset + RECORD.size > size:
+                offset = 0
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def record(self, i):
+        """(timestamp, MAC, frame) of the i-th oldest record."""
+        offset = HEADER_SIZE + self.offsets[i]
+        length, ts, mac = RECORD.unpack_from(self._data, offset)
+        start = offset + RECORD.size
+        return ts, macString(mac), self._data[start:start + length]
+
+    def find(self, start=None, end=None, mac=None):
+        """Records between the start and end timestamps, optionally of one MAC."""
+        first = bisect.bisect_left(self.times, start) if start is not None else 0
+        last = bisect.bisect_right(self.times, end) if end is not None else len(self.times)
+        if mac is None:
+            indexes = range(first, last)
+        else:
+            indexes = self.by_mac.get(macBytes(mac), [])
+            indexes = indexes[bisect.bisect_left(indexes, first):bisect.bisect_left(indexes, last)]
+        for i in indexes:
+            yield self.record(i)
+
+
+async def replay(path, handle_frame, speed=1.0, start=None, end=None, mac=None):
+    """Feed captured frames to handle_frame(frame).
+
+    speed 1.0 keeps the captured timing, 2.0 is twice as fast and 0 replays
+    as fast as possible, only yielding to the loop between frames.
+    Returns the number of frames replayed.
+    """
+    reader = CaptureReader(path)
+    count = 0
+    first = None
+    begin = time.monotonic()
+    for ts, _, frame in reader.find(start, end, mac):
+        if speed:
+            if first is None:
+                first = ts
+            delay = (ts - first) / speed - (time.monotonic() - begin)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)
+        handle_frame(frame)
+        count += 1
+    return count
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(f"usage: {argv[0]} capture_file [MAC]")
+        return 1
+    reader = CaptureReader(argv[1])
+    for ts, mac, frame in reader.find(mac=argv[2] if len(argv) > 2 else None):
+        sys.stdout.buffer.write(frame.rstrip(b"\n") + b"\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,148 @@
+"""Commands from Home Assistant to the ESP-NOW nodes."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import json
+import logging
+import time
+
+from .stats import LatencyHistogram
+
+_LOGGER = logging.getLogger("espnow")
+
+MAX_WRITE_SIZE = 1024
+
+
+class Command:
+    def __init__(self, cmd_id, mac, payload, port, ack, future):
+        self.id = cmd_id
+        self.mac = mac
+        self.port = port
+        self.ack = ack
+        self.future = future
+        self.attempts = 0
+        self.queued = time.monotonic()
+        self.timer = None
+        msg = {"MAC": mac, "id": cmd_id}
+        msg.update(payload)
+        self.frame = (json.dumps(msg, separators=(",", ":")) + "\n").encode()
+
+
+class CommandSender:
+    """Send queue for node commands.
+
+    Queued frames are joined into as few serial writes as possible, limited to
+    rate bytes per second (0 = no limit). Commands sent with ack=True stay
+    pending until the node answers with {"ack": id}, and are resent up to
+    retries times if no answer arrives within ack_timeout seconds.
+    """
+
+    def __init__(self, loop, write, rate, ack_timeout, retries):
+        self._loop = loop
+        self._write = write
+        self.rate = rate
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self._queue = deque()
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._next_id = 1
+        self.sent = 0
+        self.acked = 0
+        self.resent = 0
+        self.failed = 0
+        self.writes = 0
+        self.queue_latency = LatencyHistogram()
+        self.ack_latency = LatencyHistogram()
+
+    def send(self, mac, payload, port, ack=True):
+        """Queue a command, the returned future resolves when it was acknowledged."""
+        future = self._loop.create_future()
+        # Most callers never await the future, a failure must not end up as
+        # "Future exception was never retrieved".
+        future.add_done_callback(_retrieveException)
+        cmd = Command(self._next_id, mac, payload, port, ack, future)
+        self._next_id = self._next_id % 0xFFFF + 1
+        self._queue.append(cmd)
+        self._wakeup.set()
+        return future
+
+    def acknowledge(self, cmd_id):
+        cmd = self._pending.pop(cmd_id, None)
+        if cmd is None:
+            return
+        cmd.timer.cancel()
+        self.acked += 1
+        self.ack_latency.record(time.monotonic() - cmd.queued)
+        if not cmd.future.done():
+            cmd.future.set_result(True)
+
+    def _ackTimeout(self, cmd):
+        if self._pending.pop(cmd.id, None) is None:
+            return
+        if cmd.attempts <= self.retries:
+            _LOGGER.info("No ack for command {} to {}, resending".format(cmd.id, cmd.mac))
+            self.resent += 1
+            self._queue.appendleft(cmd)
+            self._wakeup.set()
+            return
+        _LOGGER.warning("Command {} to {} was not acknowledged".format(cmd.id, cmd.mac))
+        self.failed += 1
+        if not cmd.future.done():
+            cmd.future.set_exception(asyncio.TimeoutError())
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                batches = {}
+                size = 0
+                while self._queue and size < MAX_WRITE_SIZE:
+                    cmd = self._queue.popleft()
+                    batches.setdefault(cmd.port, []).append(cmd)
+                    size += len(cmd.frame)
+                for port, cmds in batches.items():
+                    try:
+                        await self._write(port, b"".join(cmd.frame for cmd in cmds))
+                    except Exception as ex:
+                        _LOGGER.error("Unable to write to serial device {}: {}".format(port, ex))
+                        for cmd in cmds:
+                            self.failed += 1
+                            if not cmd.future.done():
+                                cmd.future.set_exception(ex)
+                        continue
+                    self.writes += 1
+                    now = time.monotonic()
+                    for cmd in cmds:
+                        self.sent += 1
+                        cmd.attempts += 1
+                        if cmd.attempts == 1:
+                            self.queue_latency.record(now - cmd.queued)
+                        if cmd.ack:
+                            self._pending[cmd.id] = cmd
+                            cmd.timer = self._loop.call_later(self.ack_timeout, self._ackTimeout, cmd)
+                        elif not cmd.future.done():
+                            cmd.future.set_result(True)
+                # Stay within the byte budget of the serial link / radio
+                if self.rate:
+                    await asyncio.sleep(size / self.rate)
+
+    def asdict(self):
+        return {
+            "queued": len(self._queue),
+            "pending": len(self._pending),
+            "sent": self.sent,
+            "acked": self.acked,
+            "resent": self.resent,
+            "failed": self.failed,
+            "writes": self.writes,
+            "queue_latency": self.queue_latency.asdict(),
+            "ack_latency": self.ack_latency.asdict(),
+        }
+
+
+def _retrieveException(future):
+    if not future.cancelled():
+        future.exception()
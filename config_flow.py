@@ -13,14 +13,68 @@ from homeassistant.helpers.entity_registry import (
 )
 import voluptuous as vol
 
-from .const import DOMAIN, CONF_SERIAL_PORT, CONF_BAUD
+from .publish import WINDOW_AGGREGATES
+from .const import (
+    DOMAIN,
+    CONF_SERIAL_PORT,
+    CONF_BAUD,
+    CONF_MAX_BATCH,
+    CONF_IO_THREAD,
+    CONF_QUEUE_SIZE,
+    CONF_STATS,
+    CONF_LOG_SAMPLE,
+    CONF_OFFLINE_FACTOR,
+    CONF_OFFLINE_MIN_TIMEOUT,
+    CONF_DEDUP_WINDOW,
+    CONF_TX_RATE,
+    CONF_ACK_TIMEOUT,
+    CONF_RETRIES,
+    CONF_CAPTURE_FILE,
+    CONF_CAPTURE_SIZE,
+    CONF_ALLOW_MACS,
+    CONF_DENY_MACS,
+    CONF_ONBOARD_RATE,
+    CONF_CHANGE_ONLY,
+    CONF_DEADBAND,
+    CONF_RELATIVE_DEADBAND,
+    CONF_MIN_INTERVAL,
+    CONF_HEARTBEAT,
+    CONF_WINDOW,
+    CONF_WINDOW_AGGREGATE,
+)
 
 
 _LOGGER = logging.getLogger(__name__)
 
 # UI Strings are defines in strings.json
 PORT_SCHEMA = vol.Schema(
-    {vol.Required(CONF_SERIAL_PORT): cv.string, vol.Optional(CONF_BAUD): cv.positive_int}
+    {
+        vol.Required(CONF_SERIAL_PORT): cv.string,
+        vol.Optional(CONF_BAUD): cv.positive_int,
+        vol.Optional(CONF_MAX_BATCH): cv.positive_int,
+        vol.Optional(CONF_IO_THREAD, default=False): cv.boolean,
+        vol.Optional(CONF_QUEUE_SIZE): cv.positive_int,
+        vol.Optional(CONF_STATS, default=False): cv.boolean,
+        vol.Optional(CONF_LOG_SAMPLE): cv.positive_int,
+        vol.Optional(CONF_OFFLINE_FACTOR): cv.positive_float,
+        vol.Optional(CONF_OFFLINE_MIN_TIMEOUT): cv.positive_int,
+        vol.Optional(CONF_DEDUP_WINDOW): cv.positive_float,
+        vol.Optional(CONF_TX_RATE): cv.positive_int,
+        vol.Optional(CONF_ACK_TIMEOUT): cv.positive_float,
+        vol.Optional(CONF_RETRIES): cv.positive_int,
+        vol.Optional(CONF_CAPTURE_FILE): cv.string,
+        vol.Optional(CONF_CAPTURE_SIZE): cv.positive_int,
+        vol.Optional(CONF_ALLOW_MACS): cv.string,
+        vol.Optional(CONF_DENY_MACS): cv.string,
+        vol.Optional(CONF_ONBOARD_RATE): cv.positive_int,
+        vol.Optional(CONF_CHANGE_ONLY, default=True): cv.boolean,
+        vol.Optional(CONF_DEADBAND): cv.positive_float,
+        vol.Optional(CONF_RELATIVE_DEADBAND): cv.positive_float,
+        vol.Optional(CONF_MIN_INTERVAL): cv.positive_float,
+        vol.Optional(CONF_HEARTBEAT): cv.positive_float,
+        vol.Optional(CONF_WINDOW): cv.positive_float,
+        vol.Optional(CONF_WINDOW_AGGREGATE): vol.In(WINDOW_AGGREGATES),
+    }
 )
 
 class EspNowBridgeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -1,5 +1,64 @@
+from datetime import timedelta
+
 DOMAIN = "esp_now_bridge"
 EVENT_TYPE = DOMAIN + "_event"
+DATA_BRIDGES = DOMAIN + "_bridges"
+PLATFORMS = ["sensor", "binary_sensor"]
 
 CONF_SERIAL_PORT = "serial_port"
-CONF_BAUD = "baudrate"
\ No newline at end of file
+CONF_BAUD = "baudrate"
+CONF_MAX_BATCH = "max_batch"
+CONF_IO_THREAD = "io_thread"
+CONF_QUEUE_SIZE = "queue_size"
+CONF_STATS = "statistics"
+CONF_LOG_SAMPLE = "log_sample"
+CONF_OFFLINE_FACTOR = "offline_factor"
+CONF_OFFLINE_MIN_TIMEOUT = "offline_min_timeout"
+CONF_DEDUP_WINDOW = "dedup_window"
+CONF_TX_RATE = "tx_rate"
+CONF_ACK_TIMEOUT = "ack_timeout"
+CONF_RETRIES = "retries"
+CONF_CAPTURE_FILE = "capture_file"
+CONF_CAPTURE_SIZE = "capture_size"
+CONF_ALLOW_MACS = "allow_macs"
+CONF_DENY_MACS = "deny_macs"
+CONF_ONBOARD_RATE = "onboard_rate"
+CONF_CHANGE_ONLY = "change_only"
+CONF_DEADBAND = "deadband"
+CONF_RELATIVE_DEADBAND = "relative_deadband"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_HEARTBEAT = "heartbeat"
+CONF_WINDOW = "window"
+CONF_WINDOW_AGGREGATE = "window_aggregate"
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_LOG_SAMPLE = 100
+DEFAULT_OFFLINE_FACTOR = 3
+DEFAULT_OFFLINE_MIN_TIMEOUT = 60
+DEFAULT_DEDUP_WINDOW = 1.0
+DEFAULT_TX_RATE = 4000
+DEFAULT_ACK_TIMEOUT = 2.0
+DEFAULT_RETRIES = 3
+DEFAULT_CAPTURE_SIZE = 16
+DEFAULT_ONBOARD_RATE = 60
+
+STATS_INTERVAL = timedelta(seconds=10)
+WHEEL_INTERVAL = timedelta(seconds=1)
+
+SERVICE_SEND_COMMAND = "send_command"
+
+# Top level message keys describing the node itself, "ri" is the report
+# interval, "sq" the message sequence number, "ack" acknowledges a command and
+# "full" marks a message carrying all values.
+NODE_KEYS = ("MAC", "name", "ri", "sq", "ack", "full")
+# "ts" the send time in ms and "rssi" the signal strength reported by the
+# bridge. Only node keys in messages with "sq", older firmware may send
+# sensors with these names.
+LINK_KEYS = ("ts", "rssi")
+
+# Sequence numbers wrap around at this value
+SEQUENCE_MODULO = 0x10000
+# Command asking a node to send all of its values
+RESYNC_COMMAND = {"cmd": "resync"}
+RESYNC_TIMEOUT = 10
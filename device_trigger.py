@@ -7,21 +7,23 @@ from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEM
 from homeassistant.components.device_automation.exceptions import (
     InvalidDeviceAutomationConfig,
 )
-from homeassistant.components.homeassistant.triggers import event as event_trigger
 from homeassistant.const import CONF_DEVICE_ID, CONF_DOMAIN, CONF_PLATFORM, CONF_TYPE
-from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, Event, HassJob, HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError, IntegrationError
 from homeassistant.helpers.trigger import TriggerActionType, TriggerInfo
 from homeassistant.helpers.typing import ConfigType
 
 from .const import DOMAIN, EVENT_TYPE 
+from .press import pressTypes
 from . import EspNowBridge 
 
 CONF_SUBTYPE = "subtype"
+CONF_PRESS_TYPE = "press_type"
 DEVICE = "device"
+DATA_TRIGGER_DISPATCHER = DOMAIN + "_trigger_dispatcher"
 
 TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
-    {vol.Required(CONF_TYPE): str, vol.Optional(CONF_SUBTYPE): str}
+    {vol.Required(CONF_TYPE): str, vol.Optional(CONF_SUBTYPE): str, vol.Optional(CONF_PRESS_TYPE): str}
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -50,6 +52,67 @@ async def async_validate_trigger_config(
     return config
 
 
+class TriggerDispatcher:
+    """Route ESP-NOW events to the attached device triggers.
+
+    Listens on the bus once and looks the attached triggers up by
+    (device_id, type, subtype, press_type), instead of one event trigger with
+    its own data filter per automation. Triggers without a press type get
+    every event of their type and subtype.
+    """
+
+    def __init__(self, hass):
+        self.hass = hass
+        self._index = {}
+        self._count = 0
+        self._unsub = None
+
+    def attach(self, key, trigger_data, action, trigger_info):
+        if self._unsub is None:
+            self._unsub = self.hass.bus.async_listen(EVENT_TYPE, self.handleEvent)
+        entry = (trigger_data, HassJob(action, f"device trigger {trigger_info}"), trigger_info["trigger_data"])
+        self._index.setdefault(key, {})[id(entry)] = entry
+        self._count += 1
+
+        @callback
+        def detach():
+            triggers = self._index.get(key)
+            if triggers is None or triggers.pop(id(entry), None) is None:
+                return
+            if not triggers:
+                del self._index[key]
+            self._count -= 1
+            if not self._count:
+                self._unsub()
+                self._unsub = None
+
+        return detach
+
+    @callback
+    def handleEvent(self, event: Event):
+        data = event.data
+        key = (data.get(CONF_DEVICE_ID), data.get(CONF_TYPE), data.get(CONF_SUBTYPE))
+        triggers = list(self._index.get(key + (None,), {}).values())
+        if data.get(CONF_PRESS_TYPE) is not None:
+            triggers += self._index.get(key + (data[CONF_PRESS_TYPE],), {}).values()
+        for trigger_data, job, info_data in triggers:
+            # Extra trigger config has to match the event data, like the event
+            # trigger filter did.
+            if any(data.get(k) != v for k, v in trigger_data.items()):
+                continue
+            self.hass.async_run_hass_job(
+                job,
+                {
+                    "trigger": {
+                        **info_data,
+                        CONF_PLATFORM: DEVICE,
+                        "event": event,
+                        "description": f"event '{event.event_type}'",
+                    }
+                },
+                event.context,
+            )
+
 
 # Called when Automations are loaded that contain a corresponding device trigger
 async def async_attach_trigger(
@@ -75,19 +138,13 @@ async def async_attach_trigger(
         raise HomeAssistantError(f"Unable to find trigger {trigger_key}")
 
     trigger = node.device_automation_triggers[trigger_key]
-    trigger_data = {"device_id": node.device_id, **trigger}
-    _LOGGER.debug("Attach Trigger: {} {} ".format(trigger_key, trigger_data))
-
-    event_config = {
-        event_trigger.CONF_PLATFORM: "event",
-        event_trigger.CONF_EVENT_TYPE: EVENT_TYPE,
-        event_trigger.CONF_EVENT_DATA: trigger_data
-    }
+    _LOGGER.debug("Attach Trigger: {} {} ".format(trigger_key, trigger))
 
-    event_config = event_trigger.TRIGGER_SCHEMA(event_config)
-    return await event_trigger.async_attach_trigger(
-        hass, event_config, action, trigger_info, platform_type="device"
-    )
+    dispatcher = hass.data.get(DATA_TRIGGER_DISPATCHER)
+    if dispatcher is None:
+        dispatcher = hass.data[DATA_TRIGGER_DISPATCHER] = TriggerDispatcher(hass)
+    key = (node.device_id, config[CONF_TYPE], config.get(CONF_SUBTYPE) or None, config.get(CONF_PRESS_TYPE) or None)
+    return dispatcher.attach(key, dict(trigger), action, trigger_info)
 
 
 # Called when automations are created and a device trigger of the corresponding type is selected.
@@ -120,5 +177,8 @@ async def async_get_triggers(
         if (subtype):
             t[CONF_SUBTYPE] = subtype
         triggers.append(t)
+        # One trigger per press type if press detection is configured
+        for press_type in pressTypes(node.trigger_options.get(tr, {})):
+            triggers.append({**t, CONF_PRESS_TYPE: press_type})
     _LOGGER.debug("Get Triggers for {} : {}".format(device_id, triggers))
     return triggers
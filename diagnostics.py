@@ -0,0 +1,19 @@
+"""Diagnostics support for the ESP-NOW Bridge."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import EspNowBridge
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    for bridge in EspNowBridge.bridges:
+        if bridge.config_entry.entry_id == config_entry.entry_id:
+            return bridge.diagnostics()
+    return {}
@@ -0,0 +1,148 @@
+"""Serial stream framing for the ESP-NOW Bridge."""
+from __future__ import annotations
+
+import json
+import logging
+import traceback
+
+import msgpack
+
+_LOGGER = logging.getLogger("espnow")
+
+READ_CHUNK_SIZE = 4096
+MAX_FRAME_SIZE = 16384
+
+# Binary frames: marker byte, payload length (uint16, big endian), MessagePack
+# payload. 0xC1 is neither valid UTF-8 nor used by MessagePack, so it can never
+# show up inside a JSON line.
+FRAME_MSGPACK = 0xC1
+FRAME_MSGPACK_BYTE = bytes((FRAME_MSGPACK,))
+FRAME_HEADER_SIZE = 3
+
+
+class FrameSplitter:
+    """Split a serial byte stream into frames.
+
+    Chunks are appended to one reusable buffer and every complete frame in it
+    is cut out at once. A trailing partial frame stays in the buffer until the
+    rest of it arrives with a later chunk. Frames are either newline terminated
+    JSON lines or length prefixed binary frames.
+    """
+
+    def __init__(self, max_frame=MAX_FRAME_SIZE):
+        self._buffer = bytearray()
+        self.max_frame = max_frame
+
+    def feed(self, data):
+        """Add a chunk and return the list of complete frames."""
+        buf = self._buffer
+        buf += data
+        if FRAME_MSGPACK_BYTE in buf:
+            frames, pos = self._splitMixed(buf)
+            del buf[:pos]
+            if len(buf) > self.max_frame:
+                _LOGGER.warning("Dropping {} bytes without frame end".format(len(buf)))
+                buf.clear()
+            return frames
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if len(buf) > self.max_frame:
+                _LOGGER.warning("Dropping {} bytes without frame end".format(len(buf)))
+                buf.clear()
+            return []
+        frames = bytes(buf[:end]).split(b"\n")
+        del buf[:end + 1]
+        return frames
+
+    def _splitMixed(self, buf):
+        frames = []
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            if buf[pos] == FRAME_MSGPACK:
+                if size - pos < FRAME_HEADER_SIZE:
+                    break
+                length = int.from_bytes(buf[pos + 1:pos + FRAME_HEADER_SIZE], "big")
+                if length > self.max_frame:
+                    # A stray marker byte, e.g. line noise. Skip to the next line
+                    # instead of waiting for a frame that never comes.
+                    end = buf.find(b"\n", pos)
+                    if end < 0:
+                        break
+                    _LOGGER.warning("Dropping {} bytes after an invalid frame length".format(end + 1 - pos))
+                    pos = end + 1
+                    continue
+                end = pos + FRAME_HEADER_SIZE + length
+                if end > size:
+                    break
+                frames.append(bytes(buf[pos:end]))
+                pos = end
+                continue
+            end = buf.find(b"\n", pos)
+            marker = buf.find(FRAME_MSGPACK_BYTE, pos, end if end >= 0 else size)
+            if marker >= 0:
+                # Unterminated text in front of a binary frame
+                frames.append(bytes(buf[pos:marker]))
+                pos = marker
+            elif end < 0:
+                break
+            else:
+                frames.append(bytes(buf[pos:end]))
+                pos = end + 1
+        return frames, pos
+
+    def reset(self):
+        """Discard a partial frame, e.g. after a reconnect."""
+        self._buffer.clear()
+
+
+def parseFrame(data, stats=None):
+    """Decode a JSON line or binary frame into a message dict.
+
+    Returns None for anything that is not a message, e.g. debug output.
+    """
+    if data[:1] == FRAME_MSGPACK_BYTE:
+        try:
+            msg = msgpack.unpackb(data[FRAME_HEADER_SIZE:], strict_map_key=False)
+        except Exception as ex:
+            _LOGGER.exception('Received invalid MessagePack: "{}" | {} | {}'.format(data, ex, traceback.format_exc()))
+            if stats:
+                stats.parse_errors += 1
+            return None
+        if not isinstance(msg, dict):
+            _LOGGER.error("MessagePack frame is not a map: {}".format(msg))
+            if stats:
+                stats.parse_errors += 1
+            return None
+        return stringKeys(msg)
+    data = data.strip()
+    if data[:1] not in (b'{', '{'):
+        return None
+    try:
+        return json.loads(data)
+    except Exception as ex:
+        _LOGGER.exception('Received invalid JSON: "{}" | {} | {}'.format(data, ex, traceback.format_exc()))
+        if stats:
+            stats.parse_errors += 1
+        return None
+
+
+def stringKeys(msg):
+    """Turn the int or binary map keys MessagePack allows into strings, in place.
+
+    Messages are looked up and aliased by string keys, as in JSON.
+    """
+    plain = True
+    for key, value in msg.items():
+        if type(key) is not str:
+            plain = False
+        if type(value) is dict:
+            stringKeys(value)
+    if not plain:
+        items = list(msg.items())
+        msg.clear()
+        for key, value in items:
+            if isinstance(key, bytes):
+                key = key.decode("utf-8", "replace")
+            msg[key if isinstance(key, str) else str(key)] = value
+    return msg
@@ -0,0 +1,179 @@
+"""Bounded ingest queue between the serial reader and message dispatch."""
+from __future__ import annotations
+
+from collections import deque
+import logging
+
+_LOGGER = logging.getLogger("espnow")
+
+
+class IngestQueue:
+    """FIFO of decoded messages with overload coalescing.
+
+    When the queue is full, telemetry is merged into the newest queued
+    telemetry message of its node, so only the latest value per sensor stays
+    queued. Messages carrying "@" events, "$"/"^" config or a command ack are
+    never merged or dropped and act as ordering barriers for their node. Only
+    if there is nothing to merge into is the oldest telemetry message dropped.
+
+    Messages are classified once when they are queued. Entries are
+    [message, receive time, telemetry] lists, merged or dropped entries stay
+    in the FIFO with telemetry set to None and are skipped by get().
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._queue = deque()
+        self._size = 0
+        # Telemetry entries in queue order, to find the oldest one to drop
+        self._telemetry = deque()
+        # MAC -> newest queued telemetry entry with no barrier behind it
+        self._newest = {}
+        self.merged = 0
+        self.dropped = 0
+        self.high_water = 0
+        self._warned = False
+
+    def __len__(self):
+        return self._size
+
+    def put(self, msg, received=None):
+        mac = msg.get("MAC")
+        if isTelemetry(msg):
+            if self._size >= self.maxsize:
+                entry = self._newest.get(mac)
+                if entry is not None:
+                    mergeInto(entry[0], msg)
+                    self.merged += 1
+                    self._full()
+                    return
+            entry = [msg, received, True]
+            self._newest[mac] = entry
+            self._telemetry.append(entry)
+        else:
+            entry = [msg, received, False]
+            self._newest.pop(mac, None)
+        self._queue.append(entry)
+        self._size += 1
+        if self._size > self.high_water:
+            self.high_water = self._size
+        if self._size > self.maxsize:
+            self._full()
+            self.dropOldestTelemetry()
+
+    def _full(self):
+        if not self._warned:
+            _LOGGER.warning("Ingest queue full ({} messages), coalescing telemetry".format(self._size))
+            self._warned = True
+
+    def get(self, count):
+        """Return up to count (message, receive time) pairs."""
+        queue = self._queue
+        result = []
+        while queue and len(result) < count:
+            entry = queue.popleft()
+            if entry[2] is None:
+                continue
+            self._remove(entry)
+            result.append((entry[0], entry[1]))
+        telemetry = self._telemetry
+        while telemetry and telemetry[0][2] is None:
+            telemetry.popleft()
+        return result
+
+    def _remove(self, entry):
+        if entry[2]:
+            mac = entry[0].get("MAC")
+            if self._newest.get(mac) is entry:
+                del self._newest[mac]
+        entry[2] = None
+        self._size -= 1
+
+    def dropOldestTelemetry(self):
+        telemetry = self._telemetry
+        while telemetry:
+            entry = telemetry.popleft()
+            if entry[2]:
+                self._remove(entry)
+                self.dropped += 1
+                return
+
+
+def isTelemetry(msg):
+    """True if a message only carries sensor values."""
+    if "ack" in msg:
+        return False
+    return onlyValues(msg)
+
+
+def onlyValues(msg):
+    for key, value in msg.items():
+        if key[:1] in ("@", "$", "^"):
+            return False
+        if isinstance(value, dict) and not onlyValues(value):
+            return False
+    return True
+
+
+def mergeInto(target, msg):
+    for key, value in msg.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            mergeInto(target[key], value)
+        else:
+            target[key] = value
+
+
+def dedupKey(msg):
+    """Deduplicator key of a message, None if it must not be deduplicated.
+
+    (MAC, sequence number) if the node sends one. Otherwise the message
+    without "rssi", which differs between the receiving ports. Without a
+    sequence number repeated "@" events look the same, so they are never
+    deduplicated.
+    """
+    sq = msg.get("sq")
+    if sq is not None:
+        return (msg.get("MAC"), sq)
+    if hasEvents(msg):
+        return None
+    return tuple((key, freeze(value)) for key, value in msg.items() if key != "rssi")
+
+
+def hasEvents(msg):
+    for key, value in msg.items():
+        if key[:1] == "@":
+            return True
+        if isinstance(value, dict) and hasEvents(value):
+            return True
+    return False
+
+
+def freeze(value):
+    """Hashable copy of a decoded message value."""
+    if isinstance(value, dict):
+        return tuple((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Deduplicator:
+    """Recognise messages already received through another serial port.
+
+    Keys, see dedupKey(), are remembered for window seconds.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._seen = set()
+        self._expiry = deque()
+
+    def isDuplicate(self, key, now):
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            self._seen.discard(expiry.popleft()[1])
+        if key in self._seen:
+            return True
+        self._seen.add(key)
+        expiry.append((now + self.window, key))
+        return False
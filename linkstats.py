@@ -0,0 +1,114 @@
+"""Radio link statistics of a node from sequence numbers and send times."""
+from __future__ import annotations
+
+import math
+
+from .const import SEQUENCE_MODULO
+from .publish import isNumber
+
+# Expected messages per statistics window
+LINK_WINDOW = 100
+# Late messages are recognised up to this many sequence numbers back
+REORDER_WINDOW = 64
+# Send time gaps larger than this (seconds) are a node clock reset, not jitter
+MAX_TRANSIT_CHANGE = 10.0
+
+
+class LinkStats:
+    """Loss, duplicate and reordering rates, jitter and RSSI of one node.
+
+    State is fixed size: the highest sequence number, a bitmap of the last
+    REORDER_WINDOW sequence numbers and counters of the current window. Rates
+    are published every LINK_WINDOW expected messages, or received frames if
+    the node sends no sequence numbers; update() returns the values then and
+    None otherwise.
+    """
+
+    def __init__(self):
+        self.highest = None
+        self._seen = 0
+        self.expected = 0
+        self.received = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.jitter = None
+        self.rssi = None
+        self._transit = None
+        self.values = {}
+
+    def update(self, sq, ts, rssi, now):
+        # Values come straight from the node, anything malformed is ignored.
+        if not isinstance(sq, int) or isinstance(sq, bool):
+            sq = None
+        if not isFinite(ts):
+            ts = None
+        if not isFinite(rssi):
+            rssi = None
+        self.received += 1
+        if sq is not None:
+            self.sequence(sq)
+        if ts is not None:
+            self.transit(now - ts / 1000.0)
+        if rssi is not None:
+            self.rssi = rssi if self.rssi is None else self.rssi + (rssi - self.rssi) / 8
+        if self.expected >= LINK_WINDOW or (self.highest is None and self.received >= LINK_WINDOW):
+            # Nodes without sequence numbers publish every LINK_WINDOW frames.
+            return self.publish()
+        return None
+
+    def sequence(self, sq):
+        if self.highest is None or sq == 0:
+            # First message or node restarted
+            self.highest = sq
+            self._seen = 1
+            self.expected += 1
+            return
+        ahead = (sq - self.highest) % SEQUENCE_MODULO
+        if ahead == 0:
+            self.duplicates += 1
+        elif ahead < SEQUENCE_MODULO // 2:
+            # Missing sequence numbers count as lost until they show up late.
+            self.lost += ahead - 1
+            self.expected += ahead
+            self._seen = ((self._seen << ahead) | 1) & ((1 << REORDER_WINDOW) - 1)
+            self.highest = sq
+        else:
+            back = SEQUENCE_MODULO - ahead
+            if back >= REORDER_WINDOW:
+                # Too old to tell, start over from here.
+                self.highest = sq
+                self._seen = 1
+                self.expected += 1
+            elif self._seen & (1 << back):
+                self.duplicates += 1
+            else:
+                self._seen |= 1 << back
+                self.reordered += 1
+                if self.lost:
+                    self.lost -= 1
+
+    def transit(self, transit):
+        # Interarrival jitter as in RFC 3550, in seconds
+        if self._transit is not None:
+            d = abs(transit - self._transit)
+            if d < MAX_TRANSIT_CHANGE:
+                self.jitter = d if self.jitter is None else self.jitter + (d - self.jitter) / 16
+        self._transit = transit
+
+    def publish(self):
+        expected = self.expected
+        values = {
+            "loss": round(100.0 * self.lost / expected, 2) if expected else None,
+            "duplicates": round(100.0 * self.duplicates / self.received, 2) if expected else None,
+            "reordered": round(100.0 * self.reordered / self.received, 2) if expected else None,
+            "jitter": round(self.jitter * 1000.0, 2) if self.jitter is not None else None,
+            "rssi": round(self.rssi) if self.rssi is not None else None,
+        }
+        self.expected = self.received = self.lost = self.duplicates = self.reordered = 0
+        self.values = values
+        return values
+
+
+def isFinite(value):
+    return isNumber(value) and math.isfinite(value)
@@ -2,21 +2,23 @@
 from __future__ import annotations
 
 from collections.abc import Callable
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
 from homeassistant.components.logbook import LOGBOOK_ENTRY_MESSAGE, LOGBOOK_ENTRY_NAME
 from homeassistant.const import ATTR_COMMAND, ATTR_DEVICE_ID
 from homeassistant.core import Event, HomeAssistant, callback
-from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.device_registry as dr
 
-from . import EspNowBridge 
 from .const import DOMAIN, EVENT_TYPE
 
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+LOGBOOK_CACHE_SIZE = 1024
+
+
 @callback
 def async_describe_events(
     hass: HomeAssistant,
@@ -25,46 +27,38 @@ def async_describe_events(
     """Describe logbook events."""
     device_registry = dr.async_get(hass)
 
-    @callback
-    def async_describe_logbook_event(event: Event) -> dict[str, str]:
-        """Describe logbook event."""
-        device: dr.DeviceEntry | None = None
+    @lru_cache(maxsize=LOGBOOK_CACHE_SIZE)
+    def describe(device_id: str | None, event_type: str, event_subtype: str | None) -> tuple[str, str]:
+        """Device name and message for one kind of event, without the event values."""
         device_name: str = "Unknown device"
-        node = None
-        event_data: dict = event.data
-        event_type: str | None = None
-        event_subtype: str | None = None
-
-        try:
-            device_entry = device_registry.devices[event.data[ATTR_DEVICE_ID]]
-            if device_entry:
-                device_name = device_entry.name_by_user or device_entry.name or "Unknown device"
-        except (KeyError, AttributeError):
-            pass
-
-
-        _LOGGER.debug("async_describe_logbook_event: {} {} {}".format(event.data[ATTR_DEVICE_ID], device_name, event_data))
+        device_entry = device_registry.devices.get(device_id) if device_id else None
+        if device_entry:
+            device_name = device_entry.name_by_user or device_entry.name or "Unknown device"
 
-        try:
-            node = EspNowBridge.nodes_by_device_id[event.data[ATTR_DEVICE_ID]]
-        except (KeyError, AttributeError) as err:
-            raise HomeAssistantError(f"Unable to get device {event.data[ATTR_DEVICE_ID]}" ) from err
+        if event_subtype is not None and event_subtype != event_type:
+            event_type = f"{event_type} - {event_subtype}"
 
-        if event_type is None:
-            event_type = event_data.get("type", EVENT_TYPE)
+        event_type = event_type.replace("_", " ").title()
+        if "event" in event_type.lower():
+            message = f"{event_type} was fired"
+        else:
+            message = f"{event_type} event was fired"
+        return device_name, message
 
-        if event_subtype is None:
-            event_subtype = event_data.get("subtype")
+    @callback
+    def async_device_registry_updated(event: Event) -> None:
+        # Renamed or removed devices change the cached names.
+        if event.data.get("action") != "create":
+            describe.cache_clear()
 
-        if event_subtype is not None and event_subtype != event_type:
-            event_type = f"{event_type} - {event_subtype}"
+    hass.bus.async_listen(dr.EVENT_DEVICE_REGISTRY_UPDATED, async_device_registry_updated)
 
-        if event_type is not None:
-            event_type = event_type.replace("_", " ").title()
-            if "event" in event_type.lower():
-                message = f"{event_type} was fired"
-            else:
-                message = f"{event_type} event was fired"
+    @callback
+    def async_describe_logbook_event(event: Event) -> dict[str, str]:
+        """Describe logbook event."""
+        event_data: dict = event.data
+        device_name, message = describe(
+            event_data.get(ATTR_DEVICE_ID), event_data.get("type") or EVENT_TYPE, event_data.get("subtype"))
 
         if value := event_data.get("value"):
             message = f"{message} with value: {value}"
@@ -77,4 +71,4 @@ def async_describe_events(
             LOGBOOK_ENTRY_MESSAGE: message,
         }
 
-    async_describe_event(DOMAIN, EVENT_TYPE, async_describe_logbook_event)
\ No newline at end of file
+    async_describe_event(DOMAIN, EVENT_TYPE, async_describe_logbook_event)
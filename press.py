@@ -0,0 +1,112 @@
+"""Debounce and press detection for ESP-NOW device trigger events."""
+from __future__ import annotations
+
+import time
+
+# "^" trigger config keys handled here instead of being matched as event data
+PRESS_OPTIONS = ("db", "mp", "lp")
+
+PRESS_TYPES = {1: "single", 2: "double", 3: "triple"}
+MULTI_PRESS = "multi"
+LONG_PRESS = "long"
+
+
+def pressTypes(options):
+    """Press types fired by a trigger with these press options."""
+    types = []
+    if options.get("mp"):
+        types += list(PRESS_TYPES.values()) + [MULTI_PRESS]
+    elif options.get("lp"):
+        types.append(PRESS_TYPES[1])
+    if options.get("lp"):
+        types.append(LONG_PRESS)
+    return types
+
+
+class PressFilter:
+    """Turn the raw "@" values of one trigger into one event per physical action.
+
+    db: seconds after a press in which further presses (contact bounce, radio
+        retransmissions) are dropped, the same for releases. A release right
+        after a press always gets through.
+    mp: seconds to wait for further presses, fires one event with the number
+        of presses (single / double / triple)
+    lp: seconds a button has to be held for a long press. Needs the node to
+        send a true value on press and a false value on release.
+
+    fire(data, extra, received) is called for every resulting event, extra
+    holds press_type and presses if press detection is configured.
+    """
+
+    def __init__(self, loop, options, fire):
+        self._loop = loop
+        self._fire = fire
+        self.debounce = float(options.get("db") or 0)
+        self.multi_press = float(options.get("mp") or 0)
+        self.long_press = float(options.get("lp") or 0)
+        self.detect = bool(self.multi_press or self.long_press)
+        self.suppressed = 0
+        # Last accepted press (True) and release (False)
+        self._last = {}
+        self._presses = 0
+        self._multi_data = None
+        self._long_data = None
+        self._multi_timer = None
+        self._long_timer = None
+
+    def handle(self, data, received=None):
+        value = bool(data.get("value", data) if isinstance(data, dict) else data)
+        if self.debounce:
+            now = time.monotonic()
+            last = self._last.get(value)
+            if last is not None and now - last < self.debounce:
+                self.suppressed += 1
+                return
+            self._last[value] = now
+        if not self.detect:
+            self._fire(data, None, received)
+            return
+        if self.long_press:
+            if value:
+                if self._long_timer is None:
+                    self._long_data = data
+                    self._long_timer = self._loop.call_later(self.long_press, self._longPress)
+                return
+            if self._long_timer is None:
+                # Release of a long press that already fired, or without a press.
+                return
+            self._long_timer.cancel()
+            self._long_timer = None
+            data = self._long_data
+        self._press(data, received)
+
+    def _press(self, data, received):
+        if not self.multi_press:
+            self._fire(data, {"press_type": PRESS_TYPES[1], "presses": 1}, received)
+            return
+        self._presses += 1
+        self._multi_data = data
+        if self._multi_timer is not None:
+            self._multi_timer.cancel()
+        self._multi_timer = self._loop.call_later(self.multi_press, self._multiPress)
+
+    def _multiPress(self):
+        presses = self._presses
+        self._presses = 0
+        self._multi_timer = None
+        self._fire(self._multi_data, {"press_type": PRESS_TYPES.get(presses, MULTI_PRESS), "presses": presses}, None)
+
+    def _longPress(self):
+        self._long_timer = None
+        if self._multi_timer is not None:
+            # A long press ends a press sequence, earlier short presses count on their own.
+            self._multi_timer.cancel()
+            self._multiPress()
+        self._fire(self._long_data, {"press_type": LONG_PRESS, "presses": 1}, None)
+
+    def cancel(self):
+        for timer in (self._multi_timer, self._long_timer):
+            if timer is not None:
+                timer.cancel()
+        self._multi_timer = None
+        self._long_timer = None
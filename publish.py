@@ -0,0 +1,188 @@
+"""State write policies for ESP-NOW sensors."""
+from __future__ import annotations
+
+import time
+
+from .const import (
+    CONF_CHANGE_ONLY,
+    CONF_DEADBAND,
+    CONF_HEARTBEAT,
+    CONF_MIN_INTERVAL,
+    CONF_RELATIVE_DEADBAND,
+    CONF_WINDOW,
+    CONF_WINDOW_AGGREGATE,
+)
+
+# Integration option -> "$" sensor config key
+POLICY_OPTIONS = {
+    CONF_CHANGE_ONLY: "co",
+    CONF_DEADBAND: "db",
+    CONF_RELATIVE_DEADBAND: "rdb",
+    CONF_MIN_INTERVAL: "mi",
+    CONF_HEARTBEAT: "hb",
+    CONF_WINDOW: "w",
+    CONF_WINDOW_AGGREGATE: "wa",
+}
+
+WINDOW_AGGREGATES = ("mean", "last", "max", "min")
+
+# No value waiting to be written
+NO_VALUE = object()
+
+
+class PublishPolicy:
+    """Decide whether a received value is worth a state write.
+
+    co:  only write changed values (default on)
+    db:  absolute deadband for numeric values
+    rdb: deadband relative to the last written value (0.01 = 1%)
+    mi:  minimum seconds between writes, a changed value arriving earlier is
+         kept and written when the interval is over
+    hb:  maximum seconds between writes, overrides all of the above. The last
+         value is written again if nothing else was written for hb seconds.
+    w:   tumbling window in seconds, numeric values are collected and one
+         aggregate is written when the window closes
+    wa:  window aggregate, mean (default), last, max or min
+    """
+
+    def __init__(self, defaults=None):
+        self.change_only = True
+        self.deadband = None
+        self.relative_deadband = None
+        self.min_interval = 0
+        self.heartbeat = None
+        self.window = None
+        self.window_aggregate = "mean"
+        self.suppressed = 0
+        self.window_end = None
+        self._window_count = 0
+        self._window_value = None
+        self._last_value = None
+        self._last_write = None
+        self._pending = NO_VALUE
+        if defaults:
+            for option, key in POLICY_OPTIONS.items():
+                if defaults.get(option) is not None:
+                    self.configure(key, defaults[option])
+
+    def configure(self, key, value):
+        """Apply one "$" config entry. Returns False for unknown keys."""
+        if key == "co":
+            self.change_only = bool(value)
+        elif key == "db":
+            self.deadband = float(value) if value else None
+        elif key == "rdb":
+            self.relative_deadband = float(value) if value else None
+        elif key == "mi":
+            self.min_interval = float(value) if value else 0
+        elif key == "hb":
+            self.heartbeat = float(value) if value else None
+        elif key == "w":
+            self.window = float(value) if value else None
+        elif key == "wa":
+            if value not in WINDOW_AGGREGATES:
+                raise ValueError(f"Invalid window aggregate: {value}")
+            self.window_aggregate = value
+        else:
+            return False
+        return True
+
+    def accept(self, value):
+        now = time.monotonic()
+        if self._last_write is not None:
+            elapsed = now - self._last_write
+            if not self.heartbeat or elapsed < self.heartbeat:
+                if not self.changed(value):
+                    self._pending = NO_VALUE
+                    self.suppressed += 1
+                    return False
+                if elapsed < self.min_interval:
+                    # Written by due() once the interval is over
+                    self._pending = value
+                    self.suppressed += 1
+                    return False
+        self._written(value, now)
+        return True
+
+    def deadline(self):
+        """Time due() has to be called at, None if there is nothing to write later."""
+        if self._last_write is None:
+            return None
+        deadline = None
+        if self._pending is not NO_VALUE:
+            deadline = self._last_write + self.min_interval
+        if self.heartbeat:
+            heartbeat = self._last_write + self.heartbeat
+            deadline = heartbeat if deadline is None else min(deadline, heartbeat)
+        return deadline
+
+    def due(self, now):
+        """Return the value to write now, a held back value or the heartbeat, or NO_VALUE."""
+        if self._last_write is None:
+            return NO_VALUE
+        elapsed = now - self._last_write
+        if self._pending is not NO_VALUE and elapsed >= self.min_interval:
+            value = self._pending
+        elif self.heartbeat and elapsed >= self.heartbeat:
+            value = self._last_value
+        else:
+            return NO_VALUE
+        self._written(value, now)
+        return value
+
+    def _written(self, value, now):
+        self._last_write = now
+        self._last_value = value
+        self._pending = NO_VALUE
+
+    def collect(self, value, now):
+        """Add a value to the current window.
+
+        Returns the window end if this value opened a new window, the caller
+        then has to call closeWindow() at that time.
+        """
+        opened = self.window_end is None
+        if opened:
+            # Windows are aligned, so all sensors with the same window length
+            # close on the same tick.
+            self.window_end = (int(now // self.window) + 1) * self.window
+        self._window_count += 1
+        aggregate = self.window_aggregate
+        last = self._window_value
+        if last is None or aggregate == "last":
+            self._window_value = value
+        elif aggregate == "mean":
+            self._window_value = last + value
+        elif aggregate == "max":
+            self._window_value = max(last, value)
+        elif aggregate == "min":
+            self._window_value = min(last, value)
+        if self._window_count > 1:
+            self.suppressed += 1
+        return self.window_end if opened else None
+
+    def closeWindow(self):
+        """Return the aggregate of the closed window, None if it was empty."""
+        value = self._window_value
+        if value is not None and self.window_aggregate == "mean":
+            value = round(value / self._window_count, 6)
+        self.window_end = None
+        self._window_count = 0
+        self._window_value = None
+        return value
+
+    def changed(self, value):
+        last = self._last_value
+        if value == last:
+            return not self.change_only
+        if (self.deadband or self.relative_deadband) and isNumber(value) and isNumber(last):
+            diff = abs(value - last)
+            if self.deadband and diff < self.deadband:
+                return False
+            if self.relative_deadband and diff < abs(last) * self.relative_deadband:
+                return False
+        return True
+
+
+def isNumber(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
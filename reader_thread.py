@@ -0,0 +1,94 @@
+"""Serial reader running in its own thread."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import serial
+from serial import SerialException
+
+from .framing import FrameSplitter, parseFrame, READ_CHUNK_SIZE
+
+_LOGGER = logging.getLogger("espnow")
+
+READ_TIMEOUT = 0.1
+
+
+class SerialReaderThread(threading.Thread):
+    """Own the serial port, split and decode frames off the event loop.
+
+    Decoded messages (None if a frame fails to parse) and their raw frames
+    are handed to the loop with one call_soon_threadsafe per batch, together
+    with the time the batch was read and the port, so the loop sees them in
+    the order they were received.
+    """
+
+    def __init__(self, loop, url, baudrate, handle_messages, max_batch, stats=None):
+        super().__init__(name="espnow_serial_" + url, daemon=True)
+        self._loop = loop
+        self.url = url
+        self.baudrate = baudrate
+        self._handle_messages = handle_messages
+        self.max_batch = max_batch
+        self.stats = stats
+        self._port = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def write(self, data):
+        """Write to the port, called from an executor thread."""
+        port = self._port
+        if port is None:
+            raise SerialException(f"Serial device {self.url} is not connected")
+        port.write(data)
+
+    def run(self):
+        splitter = FrameSplitter()
+        stats = self.stats
+        logged_error = False
+        connected = False
+        while not self._stop_event.is_set():
+            try:
+                port = serial.serial_for_url(self.url, baudrate=self.baudrate, timeout=READ_TIMEOUT)
+            except SerialException as exc:
+                if not logged_error:
+                    _LOGGER.exception("Unable to connect to the serial device %s: %s. Will retry", self.url, exc)
+                    logged_error = True
+                self._stop_event.wait(1)
+                continue
+
+            _LOGGER.warning("Serial device %s connected (reader thread)", self.url)
+            logged_error = False
+            if stats and connected:
+                stats.reconnects += 1
+            connected = True
+            splitter.reset()
+            self._port = port
+            with port:
+                while not self._stop_event.is_set():
+                    try:
+                        chunk = port.read(min(max(port.in_waiting, 1), READ_CHUNK_SIZE))
+                    except SerialException as exc:
+                        _LOGGER.exception("Error while reading serial device %s: %s", self.url, exc)
+                        self._port = None
+                        self._stop_event.wait(1)
+                        break
+                    if not chunk:
+                        continue
+                    received = time.monotonic()
+                    frames = splitter.feed(chunk)
+                    if stats:
+                        decoded = time.monotonic()
+                        stats.addTime("read", decoded - received)
+                        stats.bytes += len(chunk)
+                        stats.frames += len(frames)
+                    # Frames that fail to parse are passed on too, for the capture.
+                    items = [(parseFrame(frame, stats), frame) for frame in frames]
+                    if stats:
+                        stats.addTime("decode", time.monotonic() - decoded)
+                    for i in range(0, len(items), self.max_batch):
+                        self._loop.call_soon_threadsafe(self._handle_messages, items[i:i + self.max_batch], received, self.url)
+            self._port = None
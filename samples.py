@@ -0,0 +1,55 @@
+"""Aggregation of array valued sensor samples."""
+from __future__ import annotations
+
+import numpy as np
+
+STATISTICS = ("mean", "min", "max", "rms", "std")
+
+
+def parseStatistics(config):
+    """Statistics from the "a" sensor config, a list or a comma separated string.
+
+    Besides STATISTICS, pN is the N-th percentile (p50, p95, p99.9).
+    """
+    if isinstance(config, str):
+        config = config.split(",")
+    statistics = []
+    for name in config:
+        name = str(name).strip().lower()
+        if name in STATISTICS:
+            statistics.append(name)
+        elif name[:1] == "p":
+            q = float(name[1:])
+            if not 0 <= q <= 100:
+                raise ValueError(f"Invalid percentile: {name}")
+            statistics.append(name)
+        else:
+            raise ValueError(f"Unknown statistic: {name}")
+    if not statistics:
+        raise ValueError("No statistics configured")
+    return tuple(statistics)
+
+
+def aggregate(samples, statistics):
+    """Compute the statistics of one array of samples, None if it is empty."""
+    data = np.asarray(samples, dtype=np.float64).ravel()
+    if data.size == 0:
+        return None
+    result = {}
+    percentiles = [s for s in statistics if s not in STATISTICS]
+    if percentiles:
+        # All percentiles in one partition of the data.
+        for name, value in zip(percentiles, np.percentile(data, [float(p[1:]) for p in percentiles])):
+            result[name] = value
+    for name in statistics:
+        if name == "mean":
+            result[name] = data.mean()
+        elif name == "min":
+            result[name] = data.min()
+        elif name == "max":
+            result[name] = data.max()
+        elif name == "rms":
+            result[name] = np.sqrt(np.dot(data, data) / data.size)
+        elif name == "std":
+            result[name] = data.std()
+    return {name: round(float(result[name]), 6) for name in statistics}
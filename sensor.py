@@ -8,14 +8,18 @@ from homeassistant.components.sensor import (
     ENTITY_ID_FORMAT,
 )
 from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
-from .const import DOMAIN
+from .const import DOMAIN, DATA_BRIDGES
+from .publish import NO_VALUE, PublishPolicy, isNumber
+from .samples import aggregate, parseStatistics
 
 import logging
+import time
 
 _LOGGER = logging.getLogger("espnow")
 
@@ -27,43 +31,45 @@ STATE_CLASS_ABBR = {
 }
 
 
+async def async_setup_entry(
+    hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Sensors are discovered from node messages, the bridge adds them in batches."""
+    hass.data[DATA_BRIDGES][config_entry.entry_id].setupPlatform(SENSOR_DOMAIN, async_add_entities)
+
+
 class EspNowSensor(SensorEntity):
 
+    _attr_should_poll = False
+
     def __init__(self, node, name, unit=None, icon=None, device_class=None, state_class=None, native_value=None, config=None, entity=None):
         self.hass = node.hass
         self._node = node
         self._attr_name = node.name + " " + name
         self._state = None
         self._available = True
+        self._publish = PublishPolicy(node.bridge.config)
+        self._pending_attributes = None
+        self._timer = None
+        self._statistics = None
         self._attr_device_class = device_class if device_class else None
         self._attr_state_class = STATE_CLASS_ABBR.get(state_class, state_class) if state_class else None
         self._attr_icon = icon if icon else None
         self._attr_native_unit_of_measurement = unit if unit else None
         self._attr_native_value = native_value if native_value else None
 
+        self._attr_unique_id = node.sensorUniqueId(name)
+
         if entity:
-            self.entity = entity
+            self.entity_id = entity.entity_id
             self.fromEntity(entity)
 
         if config:
             self.configure(config)
 
-        if not entity:
-            self.entity = node.bridge.entity_registry.async_get_or_create(
-                domain=SENSOR_DOMAIN,
-                platform=DOMAIN,
-                unique_id=node.mac + "_" + self._attr_name.lower().replace(" ", "_").replace("-", "_"),
-                config_entry=node.config_entry,
-                device_id=node.device_id,
-                original_device_class=self._attr_device_class,            
-                original_icon=self._attr_icon,
-                original_name=self._attr_name,
-                capabilities={"state_class": self._attr_state_class} if self._attr_state_class else None,
-                unit_of_measurement = self._attr_native_unit_of_measurement
-            )
-
-        self.entity_id =  self.entity.entity_id
-        _LOGGER.info("New Sensor:{} {}".format(self.entity_id, self.entity.unique_id))
+        # Registry entry and state are created by the sensor platform.
+        node.bridge.addEntity(SENSOR_DOMAIN, self)
+        _LOGGER.info("New Sensor:{} {}".format(self.entity_id, self._attr_unique_id))
 
 
     @staticmethod
@@ -89,8 +95,19 @@ class EspNowSensor(SensorEntity):
 
     @property
     def device_info(self) -> DeviceInfo:
-        _LOGGER.info("Device Info:{}".format(self._node.device_info))
-        return self._node.device_info
+        # The node created its device entry, only link to it.
+        return DeviceInfo(identifiers={(DOMAIN, self._node.mac)})
+
+    @property
+    def capability_attributes(self):
+        capabilities = super().capability_attributes
+        if self._statistics:
+            # Kept in the registry so sensors bound from it still aggregate.
+            capabilities = dict(capabilities or {}, statistics=list(self._statistics))
+        return capabilities
+
+    async def async_added_to_hass(self) -> None:
+        self._node.bridge.entityAdded(self)
 
     def configure(self, config):
         _LOGGER.info("Sensor:{} got config:{}".format(self._attr_unique_id, config))
@@ -109,13 +126,28 @@ class EspNowSensor(SensorEntity):
                 self._attr_native_unit_of_measurement = value
             elif key == "nv":
                 self._attr_native_value = value
+            elif key == "a":
+                self._statistics = parseStatistics(value)
+            elif self._publish.configure(key, value):
+                pass
             else:
                 _LOGGER.warning("Sensor:{} unknown config {}:{}".format(self._attr_unique_id, key, value))
 
+    def setAvailable(self, available):
+        if self._available != available:
+            self._available = available
+            self._node.bridge.writeState(self)
+
+    @property
+    def suppressed_writes(self):
+        return self._publish.suppressed
+
     def fromEntity(self, entity):
         self._attr_device_class = entity.original_device_class
         if entity.capabilities:
             self._attr_state_class = entity.capabilities.get('state_class')        
+            if entity.capabilities.get("statistics"):
+                self._statistics = tuple(entity.capabilities["statistics"])
         self.area_id = entity.area_id
         #self.icon = entity.icon
         #self.has_entity_name = entity.has_entity_name
@@ -127,5 +159,146 @@ class EspNowSensor(SensorEntity):
 
     def handleNewValue(self, value):
         _LOGGER.debug("{} new value: {}".format(self.name, value))
+        attributes = None
+        if self._statistics and isinstance(value, list):
+            # Array of samples, the first statistic is the state and all of
+            # them are attributes.
+            attributes = aggregate(value, self._statistics)
+            if attributes is None:
+                return
+            attributes["samples"] = len(value)
+            value = attributes[self._statistics[0]]
+        publish = self._publish
+        if publish.window and isNumber(value):
+            if publish.collect(value, time.monotonic()) is not None:
+                self.scheduleTimer()
+            return
+        self.publish(value, attributes)
+
+    def publish(self, value, attributes=None):
+        if not self._publish.accept(value):
+            if attributes is not None:
+                self._pending_attributes = attributes
+            self.scheduleTimer()
+            return
+        self._pending_attributes = None
         self._state = value
-        self.async_write_ha_state()
+        if attributes is not None:
+            self._attr_extra_state_attributes = attributes
+        self._node.bridge.writeState(self)
+        if self._publish.heartbeat:
+            self.scheduleTimer()
+
+    def nextDeadline(self):
+        publish = self._publish
+        deadline = publish.deadline()
+        if publish.window_end is not None and (deadline is None or publish.window_end < deadline):
+            deadline = publish.window_end
+        return deadline
+
+    def scheduleTimer(self):
+        # Later deadlines are picked up when the timer fires, only earlier
+        # ones move it.
+        deadline = self.nextDeadline()
+        if deadline is not None and (self._timer is None or deadline < self._timer):
+            self._timer = deadline
+            self._node.bridge.wheel.schedule(self, deadline)
+
+    def onTimer(self, now):
+        """Bridge timer wheel callback, writes closed windows, held back values and heartbeats."""
+        publish = self._publish
+        if publish.window_end is not None and now >= publish.window_end:
+            value = publish.closeWindow()
+            if value is not None:
+                self.publish(value)
+        value = publish.due(now)
+        if value is not NO_VALUE:
+            self._state = value
+            if self._pending_attributes is not None:
+                self._attr_extra_state_attributes = self._pending_attributes
+                self._pending_attributes = None
+            self._node.bridge.writeState(self)
+        self._timer = self.nextDeadline()
+        return self._timer
+
+
+# key, name, unit, state class
+BRIDGE_SENSORS = [
+    ("frames", "Frames", None, SensorStateClass.TOTAL_INCREASING),
+    ("bytes", "Bytes", "B", SensorStateClass.TOTAL_INCREASING),
+    ("messages_per_second", "Messages per second", "msg/s", SensorStateClass.MEASUREMENT),
+    ("parse_errors", "Parse errors", None, SensorStateClass.TOTAL_INCREASING),
+    ("unknown_macs", "Unknown MACs", None, SensorStateClass.TOTAL_INCREASING),
+    ("reconnects", "Reconnects", None, SensorStateClass.TOTAL_INCREASING),
+    ("read_time", "Read time", "s", SensorStateClass.TOTAL_INCREASING),
+    ("decode_time", "Decode time", "s", SensorStateClass.TOTAL_INCREASING),
+    ("dispatch_time", "Dispatch time", "s", SensorStateClass.TOTAL_INCREASING),
+    ("state_write_time", "State write time", "s", SensorStateClass.TOTAL_INCREASING),
+    ("queue_depth", "Queue depth", None, SensorStateClass.MEASUREMENT),
+    ("queue_merged", "Queue merged", None, SensorStateClass.TOTAL_INCREASING),
+    ("queue_dropped", "Queue dropped", None, SensorStateClass.TOTAL_INCREASING),
+    ("suppressed_writes", "Suppressed writes", None, SensorStateClass.TOTAL_INCREASING),
+]
+
+
+class EspNowBridgeSensor(SensorEntity):
+    """Diagnostic sensor showing one bridge statistic."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+
+    def __init__(self, bridge, key, name, unit=None, state_class=None):
+        self.hass = bridge.hass
+        self._bridge = bridge
+        self._key = key
+        self._attr_name = "ESP-NOW Bridge " + name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_unique_id = bridge.config_entry.entry_id + "_" + key
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, "bridge_" + bridge.config_entry.entry_id)})
+        bridge.addEntity(SENSOR_DOMAIN, self)
+
+    def setValue(self, values):
+        self._attr_native_value = values.get(self._key)
+        self._bridge.writeState(self)
+
+
+# key, name, unit
+LINK_SENSORS = {
+    "loss": ("Packet loss", "%"),
+    "duplicates": ("Duplicates", "%"),
+    "reordered": ("Reordered", "%"),
+    "jitter": ("Jitter", "ms"),
+    "rssi": ("RSSI", "dBm"),
+}
+
+
+class EspNowLinkSensor(SensorEntity):
+    """Diagnostic sensor showing one radio link statistic of a node."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, node, key):
+        self.hass = node.hass
+        self._node = node
+        self._key = key
+        name, unit = LINK_SENSORS[key]
+        self._attr_name = node.name + " " + name
+        self._attr_native_unit_of_measurement = unit
+        if key == "rssi":
+            self._attr_device_class = SensorDeviceClass.SIGNAL_STRENGTH
+        self._attr_unique_id = node.mac + "_link_" + key
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, node.mac)})
+        node.bridge.addEntity(SENSOR_DOMAIN, self)
+
+    @property
+    def available(self) -> bool:
+        return self._node.available
+
+    def setValue(self, values):
+        value = values.get(self._key)
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self._node.bridge.writeState(self)
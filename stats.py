@@ -0,0 +1,82 @@
+"""Statistics for the ESP-NOW Bridge pipeline."""
+from __future__ import annotations
+
+import bisect
+import time
+
+# Upper bucket bounds in milliseconds, the last bucket is open ended.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def asdict(self):
+        buckets = {"<={}ms".format(b): c for b, c in zip(LATENCY_BUCKETS_MS, self.counts)}
+        buckets[">{}ms".format(LATENCY_BUCKETS_MS[-1])] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "max_ms": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+STAGES = ("read", "decode", "dispatch", "state_write")
+
+
+class BridgeStats:
+    """Counters and per-stage timings of the bridge pipeline.
+
+    Only created when statistics are enabled, callers check for None so the
+    disabled case costs one comparison per batch.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.messages = 0
+        self.parse_errors = 0
+        self.unknown_macs = 0
+        self.reconnects = 0
+        self.stage_time = dict.fromkeys(STAGES, 0.0)
+        self.messages_per_second = 0.0
+        self._rate_time = time.monotonic()
+        self._rate_messages = 0
+
+    def addTime(self, stage, seconds):
+        self.stage_time[stage] += seconds
+
+    def updateRate(self):
+        now = time.monotonic()
+        elapsed = now - self._rate_time
+        if elapsed > 0:
+            self.messages_per_second = round((self.messages - self._rate_messages) / elapsed, 1)
+        self._rate_time = now
+        self._rate_messages = self.messages
+
+    def asdict(self):
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "messages": self.messages,
+            "parse_errors": self.parse_errors,
+            "unknown_macs": self.unknown_macs,
+            "reconnects": self.reconnects,
+            "messages_per_second": self.messages_per_second,
+            **{stage + "_time": round(seconds, 3) for stage, seconds in self.stage_time.items()},
+        }
@@ -0,0 +1,207 @@
+"""Benchmark helpers: a synthetic node fleet, a pty serial port and a bridge.
+
+The fleet writes its frames into a pseudo-terminal, the bridge reads the other
+end like a real dongle, so the whole path from the serial read to the state
+writes is measured.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import tty
+
+import msgpack
+
+from esp_now_bridge.framing import FRAME_MSGPACK_BYTE
+
+# Time given to the bridge to open the port before the first frame is sent
+SEND_LEAD = 0.5
+
+
+class Fleet:
+    """N nodes with M sensors each, part of them in nested objects.
+
+    Nodes announce their sensors with "$" and a button with "^" config, then
+    send telemetry with sequence numbers and send times. event_rate is the
+    share of telemetry messages that also carry a button press.
+    """
+
+    def __init__(self, nodes=100, sensors=8, nested=2, event_rate=0.05, binary=False, seed=1):
+        self.size = nodes
+        self.sensors = sensors
+        self.nested = min(nested, sensors)
+        self.event_rate = event_rate
+        self.binary = binary
+        self.macs = ["02:00:{:02X}:{:02X}:{:02X}:{:02X}".format(*(i + 1).to_bytes(4, "big")) for i in range(nodes)]
+        self._random = random.Random(seed)
+        self._sq = [0] * nodes
+
+    def configMessages(self):
+        messages = []
+        for i, mac in enumerate(self.macs):
+            msg = {"MAC": mac, "name": "bench {}".format(i)}
+            for s in range(self.sensors - self.nested):
+                msg["$s{}".format(s)] = {"u": "C", "sc": "m"}
+            if self.nested:
+                msg["env"] = {"$n{}".format(s): {"u": "%"} for s in range(self.nested)}
+            msg["^button"] = None
+            messages.append(msg)
+        return messages
+
+    def telemetry(self, i, ts=None):
+        """Next telemetry message of node i, ts is the send time in seconds."""
+        rnd = self._random
+        msg = {"MAC": self.macs[i], "sq": self._sq[i]}
+        self._sq[i] = (self._sq[i] + 1) % 0x10000
+        if ts is not None:
+            msg["ts"] = int(ts * 1000)
+        for s in range(self.sensors - self.nested):
+            msg["s{}".format(s)] = round(rnd.uniform(15, 30), 1)
+        if self.nested:
+            msg["env"] = {"n{}".format(s): rnd.randint(0, 100) for s in range(self.nested)}
+        if self.event_rate and rnd.random() < self.event_rate:
+            msg["@button"] = 1
+        return msg
+
+    def encode(self, msg):
+        if self.binary:
+            payload = msgpack.packb(msg)
+            return FRAME_MSGPACK_BYTE + len(payload).to_bytes(2, "big") + payload
+        return json.dumps(msg, separators=(",", ":")).encode() + b"\n"
+
+    def schedule(self, count, rate, start):
+        """(send time, frame) pairs of count telemetry messages at rate msg/s, round robin over the nodes."""
+        return [(start + n / rate, self.encode(self.telemetry(n % self.size, start + n / rate))) for n in range(count)]
+
+
+class PtySerial:
+    """Pseudo-terminal standing in for the bridge dongle."""
+
+    def __init__(self):
+        self.master, self._slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.sent = 0
+        self._thread = None
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.master, view):]
+
+    def play(self, schedule):
+        """Write the (send time, frame) pairs in a thread, each at its send time."""
+        def run():
+            for when, frame in schedule:
+                delay = when - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.write(frame)
+                self.sent += 1
+        self._thread = threading.Thread(target=run, name="espnow_bench_pty", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.join()
+        os.close(self.master)
+        os.close(self._slave)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def measureDispatch(bridge):
+    """Record send-to-dispatch latencies of messages carrying a send time."""
+    latencies = []
+    dispatch = bridge.dispatchMessage
+
+    def wrapper(msg, received=None):
+        ts = msg.get("ts")
+        dispatch(msg, received)
+        if ts is not None:
+            latencies.append(time.monotonic() - ts / 1000.0)
+    bridge.dispatchMessage = wrapper
+    return latencies
+
+
+async def waitFor(condition, timeout=60.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise TimeoutError("benchmark did not finish within {}s".format(timeout))
+        await asyncio.sleep(0.01)
+
+
+async def createBridge(hass, port, entry=None, **options):
+    """Set up an EspNowBridge with mock entity platforms for both domains.
+
+    Pass the entry of an earlier bridge to restart it from its store.
+    """
+    from homeassistant.helpers.storage import Store
+    from pytest_homeassistant_custom_component.common import MockConfigEntry, MockEntityPlatform
+
+    from esp_now_bridge import EspNowBridge
+    from esp_now_bridge.const import CONF_SERIAL_PORT, DOMAIN, PLATFORMS
+
+    if entry is None:
+        entry = MockConfigEntry(domain=DOMAIN, data={CONF_SERIAL_PORT: port, **options})
+        entry.add_to_hass(hass)
+    hass.data.setdefault(DOMAIN, {})
+    store = Store(hass, EspNowBridge._STORAGE_VERSION, EspNowBridge._STORAGE_KEY)
+    store_data = await store.async_load()
+    start = time.monotonic()
+    bridge = EspNowBridge(hass, entry, store, store_data)
+    bridge.bench_setup_time = time.monotonic() - start
+    bridge.bench_platforms = []
+    for domain in PLATFORMS:
+        platform = MockEntityPlatform(hass, domain=domain, platform_name=DOMAIN)
+        platform.config_entry = entry
+        bridge.setupPlatform(domain, platform._async_schedule_add_entities)
+        bridge.bench_platforms.append(platform)
+    return bridge
+
+
+async def closeBridge(hass, bridge, save=False):
+    """Stop a bridge and remove its entities, save writes its store first."""
+    from esp_now_bridge import EspNowBridge
+
+    if save:
+        bridge.save_config()
+        await bridge._store.async_save(bridge._storeData())
+    bridge.stop()
+    await bridge.waitStopped()
+    for platform in bridge.bench_platforms:
+        await platform.async_reset()
+    EspNowBridge.nodes_by_device_id.clear()
+    await hass.async_block_till_done()
+
+
+def createNodes(bridge, fleet):
+    """Create the nodes of a fleet directly and apply their config messages."""
+    from esp_now_bridge import Node
+
+    for msg in fleet.configMessages():
+        Node(bridge, msg["MAC"], msg["name"])
+        bridge.dispatchMessage(msg)
+
+
+async def onboardFleet(hass, bridge, pty, fleet):
+    """Send the config messages of all nodes and create the nodes and their entities."""
+    bridge.admission.max_pending = fleet.size
+    bridge.admission.rate = 0
+    frames = bridge.stats.frames
+    for msg in fleet.configMessages():
+        pty.write(fleet.encode(msg))
+    await waitFor(lambda: bridge.stats.frames - frames >= fleet.size and not len(bridge._ingest))
+    bridge.onboardNodes(time.monotonic())
+    await hass.async_block_till_done()
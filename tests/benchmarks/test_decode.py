@@ -0,0 +1,27 @@
+"""JSON lines versus MessagePack frames: size and decode time."""
+import time
+
+from esp_now_bridge.framing import FrameSplitter, parseFrame
+
+from harness import Fleet
+
+MESSAGES = 50000
+
+
+def test_decode(report):
+    for binary in (False, True):
+        fleet = Fleet(200, 8, binary=binary)
+        frames = [fleet.encode(fleet.telemetry(n % fleet.size, n / 1000)) for n in range(MESSAGES)]
+        data = b"".join(frames)
+        # Frames as the splitter hands them over, JSON lines without the newline.
+        frames = FrameSplitter().feed(data)
+        start = time.perf_counter()
+        for frame in frames:
+            parseFrame(frame)
+        elapsed = time.perf_counter() - start
+        assert parseFrame(frames[0])["MAC"] == fleet.macs[0]
+        report(
+            "decode[{}]".format("msgpack" if binary else "json"),
+            bytes_per_msg=len(data) / MESSAGES,
+            us_per_msg=elapsed / MESSAGES * 1e6,
+        )
@@ -0,0 +1,80 @@
+"""Fire-to-action latency of device triggers versus the number of automations."""
+import random
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.components.homeassistant.triggers import event as event_trigger  # noqa: E402
+from homeassistant.core import callback  # noqa: E402
+
+from esp_now_bridge import device_trigger  # noqa: E402
+from esp_now_bridge.const import DOMAIN, EVENT_TYPE  # noqa: E402
+
+from harness import Fleet, PtySerial, closeBridge, createBridge, createNodes, percentile  # noqa: E402
+
+EVENTS = 2000
+
+
+def triggerInfo(i):
+    return {
+        "domain": "automation",
+        "name": "bench {}".format(i),
+        "home_assistant_start": False,
+        "variables": {},
+        "trigger_data": {"id": str(i), "idx": "0", "alias": None},
+    }
+
+
+async def attachDispatcher(hass, node, action, i):
+    config = {"platform": "device", "domain": DOMAIN, "device_id": node.device_id, "type": "button"}
+    return await device_trigger.async_attach_trigger(hass, config, action, triggerInfo(i))
+
+
+async def attachEventTrigger(hass, node, action, i):
+    """One event listener with a data filter per automation, as before the dispatcher."""
+    config = event_trigger.TRIGGER_SCHEMA({
+        "platform": "event",
+        "event_type": EVENT_TYPE,
+        "event_data": {"device_id": node.device_id, "type": "button"},
+    })
+    return await event_trigger.async_attach_trigger(hass, config, action, triggerInfo(i), platform_type="device")
+
+
+@pytest.mark.parametrize("attach", [attachDispatcher, attachEventTrigger], ids=["dispatcher", "event_trigger"])
+@pytest.mark.parametrize("automations", [10, 100, 600, 2000])
+async def test_fire_to_action(hass, report, automations, attach):
+    fleet = Fleet(automations, 1, nested=0)
+    pty = PtySerial()
+    bridge = await createBridge(hass, pty.port)
+    fired = []
+    done = []
+
+    @callback
+    def action(run_variables, context=None):
+        done.append(time.monotonic())
+
+    try:
+        createNodes(bridge, fleet)
+        nodes = list(bridge.nodes.values())
+        detach = [await attach(hass, node, action, i) for i, node in enumerate(nodes)]
+        rnd = random.Random(1)
+        for _ in range(EVENTS):
+            node = rnd.choice(nodes)
+            fired.append(time.monotonic())
+            node.fireEvent("button", 1)
+            await hass.async_block_till_done()
+        for unsub in detach:
+            unsub()
+    finally:
+        await closeBridge(hass, bridge)
+        pty.close()
+
+    assert len(done) == EVENTS
+    latencies = [d - f for f, d in zip(fired, done)]
+    report(
+        "device_trigger[{} {}]".format(attach.__name__[6:], automations),
+        p50_us=percentile(latencies, 50) * 1e6,
+        p99_us=percentile(latencies, 99) * 1e6,
+    )
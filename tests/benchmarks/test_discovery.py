@@ -0,0 +1,36 @@
+"""Discovery-to-available time when many nodes announce their sensors at once."""
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from esp_now_bridge.const import CONF_ONBOARD_RATE, CONF_STATS  # noqa: E402
+
+from harness import PtySerial, Fleet, closeBridge, createBridge, onboardFleet, waitFor  # noqa: E402
+
+
+@pytest.mark.parametrize("nodes,sensors", [(150, 13), (500, 8)])
+async def test_discovery_burst(hass, report, nodes, sensors):
+    fleet = Fleet(nodes, sensors)
+    pty = PtySerial()
+    bridge = await createBridge(hass, pty.port, **{CONF_STATS: True, CONF_ONBOARD_RATE: 0})
+    try:
+        start = time.monotonic()
+        await onboardFleet(hass, bridge, pty, fleet)
+        entities = nodes * sensors
+        await waitFor(lambda: bridge.entity_add_latency.count >= entities)
+        elapsed = time.monotonic() - start
+        latency = bridge.entity_add_latency.asdict()
+        batches = bridge.entity_batches
+    finally:
+        await closeBridge(hass, bridge)
+        pty.close()
+
+    report(
+        "discovery[{} nodes x {} sensors]".format(nodes, sensors),
+        total_ms=elapsed * 1000,
+        add_mean_ms=latency["mean_ms"],
+        add_max_ms=latency["max_ms"],
+        batches=batches,
+    )
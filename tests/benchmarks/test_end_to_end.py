@@ -0,0 +1,62 @@
+"""Serial to state write throughput and latency of the whole bridge."""
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from esp_now_bridge.const import CONF_IO_THREAD, CONF_ONBOARD_RATE, CONF_STATS  # noqa: E402
+
+from harness import (  # noqa: E402
+    SEND_LEAD,
+    Fleet,
+    PtySerial,
+    closeBridge,
+    createBridge,
+    measureDispatch,
+    onboardFleet,
+    percentile,
+    waitFor,
+)
+
+
+@pytest.mark.parametrize("io_thread", [False, True], ids=["loop", "thread"])
+@pytest.mark.parametrize("binary", [False, True], ids=["json", "msgpack"])
+@pytest.mark.parametrize("nodes,sensors,rate", [(100, 8, 2000), (500, 8, 2000), (200, 32, 1000)])
+async def test_end_to_end(hass, report, nodes, sensors, rate, binary, io_thread):
+    fleet = Fleet(nodes, sensors, binary=binary)
+    pty = PtySerial()
+    bridge = await createBridge(hass, pty.port, **{CONF_STATS: True, CONF_IO_THREAD: io_thread, CONF_ONBOARD_RATE: 0})
+    try:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await onboardFleet(hass, bridge, pty, fleet)
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        assert len(bridge.nodes) == nodes
+
+        count = rate * 5
+        latencies = measureDispatch(bridge)
+        frames = bridge.stats.frames
+        schedule = fleet.schedule(count, rate, time.monotonic() + SEND_LEAD)
+        cpu = time.process_time()
+        pty.play(schedule)
+        await waitFor(lambda: bridge.stats.frames - frames >= count and not len(bridge._ingest))
+        await hass.async_block_till_done()
+        elapsed = time.monotonic() - schedule[0][0]
+        cpu = time.process_time() - cpu
+    finally:
+        await closeBridge(hass, bridge)
+        pty.close()
+
+    report(
+        "end_to_end[{}x{} {}/s {} {}]".format(nodes, sensors, rate, "msgpack" if binary else "json",
+                                             "thread" if io_thread else "loop"),
+        msg_per_s=count / elapsed,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        cpu_us_per_msg=cpu / count * 1e6,
+        kb_per_node=memory / nodes / 1024,
+        merged=bridge._ingest.merged,
+    )
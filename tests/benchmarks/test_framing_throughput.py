@@ -0,0 +1,62 @@
+"""Chunked framing versus one readline() per message."""
+import asyncio
+import time
+
+from esp_now_bridge.framing import READ_CHUNK_SIZE, FrameSplitter, parseFrame
+
+from harness import Fleet
+
+MESSAGES = 50000
+
+
+async def consume(read, data):
+    reader = asyncio.StreamReader(limit=len(data) + 1)
+    reader.feed_data(data)
+    reader.feed_eof()
+    return await read(reader)
+
+
+async def readLines(reader):
+    count = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            return count
+        line = line.decode("utf-8").strip()
+        if line[:1] == "{" and parseFrame(line) is not None:
+            count += 1
+
+
+async def readChunks(reader):
+    splitter = FrameSplitter()
+    count = 0
+    while True:
+        chunk = await reader.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return count
+        for frame in splitter.feed(chunk):
+            if parseFrame(frame) is not None:
+                count += 1
+
+
+def test_framing_throughput(report):
+    fleet = Fleet(200, 8)
+    data = b"".join(fleet.encode(fleet.telemetry(n % fleet.size)) for n in range(MESSAGES))
+    for name, read in (("readline", readLines), ("chunked", readChunks)):
+        start = time.perf_counter()
+        assert asyncio.run(consume(read, data)) == MESSAGES
+        elapsed = time.perf_counter() - start
+        report("framing[{}]".format(name), msg_per_s=MESSAGES / elapsed, mb_per_s=len(data) / elapsed / 1e6)
+
+
+def test_splitter_only(report):
+    fleet = Fleet(200, 8)
+    data = b"".join(fleet.encode(fleet.telemetry(n % fleet.size)) for n in range(MESSAGES))
+    splitter = FrameSplitter()
+    start = time.perf_counter()
+    frames = 0
+    for i in range(0, len(data), READ_CHUNK_SIZE):
+        frames += len(splitter.feed(data[i:i + READ_CHUNK_SIZE]))
+    elapsed = time.perf_counter() - start
+    assert frames == MESSAGES
+    report("framing[split only]", frames_per_s=frames / elapsed, mb_per_s=len(data) / elapsed / 1e6)
@@ -0,0 +1,48 @@
+"""Rendering logbook descriptions of historic button events."""
+import random
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.components.logbook import LOGBOOK_ENTRY_NAME  # noqa: E402
+from homeassistant.core import Event  # noqa: E402
+
+from esp_now_bridge import logbook  # noqa: E402
+from esp_now_bridge.const import EVENT_TYPE  # noqa: E402
+
+from harness import Fleet, PtySerial, closeBridge, createBridge, createNodes  # noqa: E402
+
+EVENTS = 100000
+
+
+async def test_describe_events(hass, report):
+    fleet = Fleet(200, 1, nested=0)
+    pty = PtySerial()
+    bridge = await createBridge(hass, pty.port)
+    try:
+        createNodes(bridge, fleet)
+        described = {}
+        logbook.async_describe_events(hass, lambda domain, event_type, describe: described.setdefault(event_type, describe))
+        describe = described[EVENT_TYPE]
+        rnd = random.Random(1)
+        device_ids = [node.device_id for node in bridge.nodes.values()] + ["removed_device"]
+        events = [
+            Event(EVENT_TYPE, {
+                "device_id": rnd.choice(device_ids),
+                "type": "button",
+                "subtype": rnd.choice((None, "left", "right")),
+                "value": rnd.randint(1, 3),
+            })
+            for _ in range(EVENTS)
+        ]
+        start = time.perf_counter()
+        entries = [describe(event) for event in events]
+        elapsed = time.perf_counter() - start
+    finally:
+        await closeBridge(hass, bridge)
+        pty.close()
+
+    assert any(entry[LOGBOOK_ENTRY_NAME] == "Unknown device" for entry in entries)
+    report("logbook[{} events]".format(EVENTS), events_per_s=EVENTS / elapsed, us_per_event=elapsed / EVENTS * 1e6)
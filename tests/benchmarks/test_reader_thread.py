@@ -0,0 +1,82 @@
+"""Event loop latency while reading a burst, in-loop reader versus reader thread."""
+import asyncio
+import time
+
+import pytest
+import serial
+
+from esp_now_bridge.framing import READ_CHUNK_SIZE, FrameSplitter, parseFrame
+from esp_now_bridge.reader_thread import SerialReaderThread
+
+from harness import SEND_LEAD, Fleet, PtySerial, percentile, waitFor
+
+PROBE_INTERVAL = 0.001
+
+
+async def probeLoop(lags, done):
+    """Measure how late the loop wakes up a 1 ms sleep."""
+    while not done.is_set():
+        start = time.monotonic()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.monotonic() - start - PROBE_INTERVAL)
+
+
+def readInLoop(loop, url, handle):
+    """Read, split and decode on the loop like serialReaderTask."""
+    port = serial.serial_for_url(url, baudrate=460800, timeout=0)
+    splitter = FrameSplitter()
+
+    def readable():
+        frames = splitter.feed(port.read(READ_CHUNK_SIZE))
+        handle([msg for msg in map(parseFrame, frames) if msg is not None])
+    loop.add_reader(port.fileno(), readable)
+
+    def stop():
+        loop.remove_reader(port.fileno())
+        port.close()
+    return stop
+
+
+def readInThread(loop, url, handle):
+    thread = SerialReaderThread(loop, url, 460800, lambda items, received, port: handle(items), 100)
+    thread.start()
+
+    def stop():
+        thread.stop()
+        thread.join()
+    return stop
+
+
+async def measure(reader, count, rate):
+    loop = asyncio.get_running_loop()
+    fleet = Fleet(200, 8)
+    pty = PtySerial()
+    received = []
+    stop = reader(loop, pty.port, lambda items: received.append(len(items)))
+    lags = []
+    done = asyncio.Event()
+    probe = loop.create_task(probeLoop(lags, done))
+    start = time.monotonic() + SEND_LEAD
+    pty.play(fleet.schedule(count, rate, start))
+    try:
+        await waitFor(lambda: sum(received) >= count, timeout=30)
+    finally:
+        done.set()
+        await probe
+        stop()
+        pty.close()
+    return lags, time.monotonic() - start
+
+
+@pytest.mark.parametrize("rate", [2000, 20000])
+def test_loop_latency(report, rate):
+    count = rate * 3 if rate <= 2000 else 20000
+    for name, reader in (("loop", readInLoop), ("thread", readInThread)):
+        lags, elapsed = asyncio.run(measure(reader, count, rate))
+        report(
+            "loop_latency[{} {}/s]".format(name, rate),
+            p50_ms=percentile(lags, 50) * 1000,
+            p99_ms=percentile(lags, 99) * 1000,
+            max_ms=max(lags) * 1000,
+            msg_per_s=count / elapsed,
+        )
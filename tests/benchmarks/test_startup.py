@@ -0,0 +1,33 @@
+"""Bridge setup time with stored nodes and registered sensors."""
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from harness import Fleet, PtySerial, closeBridge, createBridge, createNodes  # noqa: E402
+
+
+@pytest.mark.parametrize("nodes", [1000, 5000])
+async def test_startup(hass, report, nodes):
+    fleet = Fleet(nodes, 4, nested=0)
+    pty = PtySerial()
+    bridge = await createBridge(hass, pty.port)
+    try:
+        createNodes(bridge, fleet)
+        await hass.async_block_till_done()
+    finally:
+        await closeBridge(hass, bridge, save=True)
+    entry = bridge.config_entry
+
+    bridge = await createBridge(hass, pty.port, entry=entry)
+    try:
+        restored = len(bridge.nodes)
+        sensors = sum(len(node.sensors) for node in bridge.nodes.values())
+        setup_time = bridge.bench_setup_time
+        restore_time = bridge.startup_time
+    finally:
+        await closeBridge(hass, bridge)
+        pty.close()
+
+    assert restored == nodes
+    assert sensors == nodes * fleet.sensors
+    report("startup[{} nodes]".format(nodes), setup_ms=setup_time * 1000, restore_ms=restore_time * 1000)
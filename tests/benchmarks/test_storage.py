@@ -0,0 +1,45 @@
+"""Cost of a store write versus the number of nodes."""
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.helpers.json import json_bytes  # noqa: E402
+
+from harness import Fleet, PtySerial, closeBridge, createBridge, createNodes  # noqa: E402
+
+
+@pytest.mark.parametrize("nodes", [100, 1000, 5000])
+async def test_save_cost(hass, report, nodes):
+    fleet = Fleet(nodes, 4, nested=0)
+    pty = PtySerial()
+    bridge = await createBridge(hass, pty.port)
+    try:
+        createNodes(bridge, fleet)
+        bridge._storeData()
+        node = next(iter(bridge.nodes.values()))
+
+        start = time.perf_counter()
+        bridge.save_config(node)
+        data = bridge._storeData()
+        one = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bridge.save_config()
+        bridge._storeData()
+        full = time.perf_counter() - start
+
+        start = time.perf_counter()
+        json_bytes(data)
+        encode = time.perf_counter() - start
+    finally:
+        await closeBridge(hass, bridge)
+        pty.close()
+
+    report(
+        "save[{} nodes]".format(nodes),
+        one_node_ms=one * 1000,
+        all_nodes_ms=full * 1000,
+        encode_ms=encode * 1000,
+    )
@@ -0,0 +1,103 @@
+"""Test setup.
+
+The integration is imported as the package "esp_now_bridge" from the
+repository root. Without Home Assistant installed, the package is registered
+without running __init__.py, so the modules that do not import Home Assistant
+(framing, ingest, publish, timerwheel, ...) can still be tested.
+
+Benchmarks in tests/benchmarks only run with --benchmark, their results are
+printed at the end of the run.
+"""
+from __future__ import annotations
+
+import importlib.util
+import pathlib
+import sys
+import types
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+PACKAGE = "esp_now_bridge"
+
+try:
+    import pytest_homeassistant_custom_component  # noqa: F401
+except ImportError:
+    HAS_HASS = False
+else:
+    HAS_HASS = True
+    pytest_plugins = ["pytest_homeassistant_custom_component"]
+
+
+def _loadPackage():
+    if PACKAGE in sys.modules:
+        return
+    try:
+        import homeassistant  # noqa: F401
+    except ImportError:
+        module = types.ModuleType(PACKAGE)
+        module.__path__ = [str(ROOT)]
+        sys.modules[PACKAGE] = module
+        return
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = module
+    spec.loader.exec_module(module)
+
+
+_loadPackage()
+
+_results = []
+
+
+class _RootDirectory:
+    """Collect the repository root as a plain directory.
+
+    The root is the integration package itself, pytest would import its
+    __init__.py a second time under the name of the checkout directory.
+    """
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collect_directory(self, path, parent):
+        if path == ROOT:
+            return pytest.Dir.from_parent(parent, path=path)
+        return None
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    config.pluginmanager.register(_RootDirectory(), "esp_now_bridge_root")
+    if HAS_HASS:
+        # The Home Assistant fixtures are plain async fixtures.
+        config.option.asyncio_mode = "auto"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="run the benchmarks in tests/benchmarks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmarks" in item.path.parts:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def report():
+    """Record one benchmark result: report(name, **values)."""
+    def add(name, **values):
+        _results.append((name, values))
+    return add
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("benchmark results")
+    for name, values in _results:
+        terminalreporter.write_line("{:<48} {}".format(name, "  ".join(
+            "{}={}".format(k, round(v, 3) if isinstance(v, float) else v) for k, v in values.items())))
@@ -0,0 +1,51 @@
+from esp_now_bridge.admission import MAX_PENDING_MESSAGES, AdmissionControl, matches, parseMacList
+
+
+def test_mac_patterns():
+    patterns = parseMacList(" aa:bb:cc:* , 11:22:33:44:55:66,")
+    assert patterns == ("AA:BB:CC:*", "11:22:33:44:55:66")
+    assert matches("AA:BB:CC:01:02:03", patterns)
+    assert matches("11:22:33:44:55:66", patterns)
+    assert not matches("11:22:33:44:55:67", patterns)
+
+
+def test_allow_and_deny_lists():
+    admission = AdmissionControl(allow="AA:*", deny="AA:00:*")
+    assert admission.park("AA:01:00:00:00:00", {}, 0)
+    assert not admission.park("AA:00:00:00:00:01", {}, 0)
+    assert not admission.park("BB:00:00:00:00:01", {}, 0)
+    assert admission.rejected == 2
+
+
+def test_pending_queue_is_bounded():
+    admission = AdmissionControl(max_pending=2)
+    for i in range(3):
+        admission.park("AA:00:00:00:00:0{}".format(i), {"i": i}, i)
+    admission.park("AA:00:00:00:00:00", {"i": 3}, 3)
+    assert len(admission) == 2
+    assert admission.overflow == 1
+    assert admission.take(0) == [
+        ("AA:00:00:00:00:00", [({"i": 0}, 0), ({"i": 3}, 3)]),
+        ("AA:00:00:00:00:01", [({"i": 1}, 1)]),
+    ]
+
+
+def test_config_is_kept_while_waiting():
+    admission = AdmissionControl()
+    admission.park("AA:00:00:00:00:00", {"t": 0}, 0)
+    admission.park("AA:00:00:00:00:00", {"name": "Node", "$t": {"u": "C"}}, 1)
+    for i in range(1, MAX_PENDING_MESSAGES + 5):
+        admission.park("AA:00:00:00:00:00", {"t": i}, i + 1)
+    [(mac, messages)] = admission.take(0)
+    assert messages[0] == ({"name": "Node", "$t": {"u": "C"}}, 1)
+    assert [msg["t"] for msg, _ in messages[1:]] == list(range(5, MAX_PENDING_MESSAGES + 5))
+
+
+def test_onboarding_rate():
+    admission = AdmissionControl(rate=2)
+    for i in range(5):
+        admission.park("AA:00:00:00:00:0{}".format(i), {}, 0)
+    assert len(admission.take(0)) == 2
+    assert admission.take(10) == []
+    assert len(admission.take(30)) == 1
+    assert admission.asdict()["onboarded"] == 3
@@ -0,0 +1,141 @@
+"""Bridge and node behaviour, set up against the Home Assistant test fixtures."""
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.helpers.json import json_bytes  # noqa: E402
+from homeassistant.helpers.storage import Store  # noqa: E402
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_capture_events  # noqa: E402
+
+from esp_now_bridge import MAX_MISSING_SENSORS, EspNowBridge, Node  # noqa: E402
+from esp_now_bridge.const import CONF_SERIAL_PORT, DOMAIN, EVENT_TYPE  # noqa: E402
+
+MAC = "AA:BB:CC:DD:EE:01"
+
+
+def frame(**msg):
+    return ('{"MAC": "%s", ' % MAC + ", ".join('"{}": {}'.format(k, v) for k, v in msg.items()) + "}").encode()
+
+
+@pytest.fixture
+async def bridge(hass):
+    # A pseudo-terminal nobody writes to stands in for the serial dongle.
+    master, slave = os.openpty()
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_SERIAL_PORT: os.ttyname(slave)})
+    entry.add_to_hass(hass)
+    hass.data.setdefault(DOMAIN, {})
+    store = Store(hass, EspNowBridge._STORAGE_VERSION, EspNowBridge._STORAGE_KEY)
+    bridge = EspNowBridge(hass, entry, store, None)
+    yield bridge
+    bridge.stop()
+    await bridge.waitStopped()
+    EspNowBridge.nodes_by_device_id.clear()
+    await hass.async_block_till_done()
+    os.close(master)
+    os.close(slave)
+
+
+async def test_press_and_release_in_one_batch_fire_in_order(hass, bridge):
+    events = async_capture_events(hass, EVENT_TYPE)
+    Node(bridge, MAC, "Node")
+    bridge.dispatchMessage({"MAC": MAC, "^button": {"t": "button", "lp": 0.5}})
+    frames = [frame(**{"@button": 1}), frame(**{"@button": 0})]
+    bridge.handleFrames(frames, time.monotonic(), bridge.serial_ports[0])
+    await hass.async_block_till_done()
+    # A release ahead of its press would turn the press into a long press.
+    assert [(e.data["press_type"], e.data["value"]) for e in events] == [("single", 1)]
+
+
+async def test_events_wait_behind_a_queued_config_message(hass, bridge):
+    events = async_capture_events(hass, EVENT_TYPE)
+    Node(bridge, MAC, "Node")
+    frames = [frame(**{"^button": '"button"', "@button": 1}), frame(**{"@button": 0})]
+    bridge.handleFrames(frames, time.monotonic(), bridge.serial_ports[0])
+    assert events == []
+    await hass.async_block_till_done()
+    assert [e.data["value"] for e in events] == [1, 0]
+
+
+async def test_store_data_encodes_only_changed_nodes(hass, bridge):
+    node = Node(bridge, MAC, "Node")
+    Node(bridge, "AA:BB:CC:DD:EE:02", "Other")
+    bridge.save_config()
+    bridge._storeData()
+    node._attr_name = "Renamed"
+    bridge.save_config(node)
+    data = json.loads(json_bytes(bridge._storeData()))
+    assert data["nodes"][MAC]["name"] == "Renamed"
+    assert data["nodes"]["AA:BB:CC:DD:EE:02"]["name"] == "Other"
+    assert bridge.save_stats["serialized_nodes"] == 3
+
+
+def recordCommands(bridge):
+    commands = []
+    bridge.sendCommand = lambda mac, payload, ack=True: commands.append((mac, payload))
+    return commands
+
+
+async def test_resync_only_for_delta_nodes(hass, bridge):
+    commands = recordCommands(bridge)
+    node = Node(bridge, MAC, "Node")
+    for sq in (1, 2, 5):
+        node.checkSequence(sq, None, 0.0)
+    assert (node.sq_gaps, commands) == (1, [])
+    node.checkSequence(6, 1, 0.0)
+    assert node.delta
+    node.checkSequence(9, None, 1.0)
+    assert commands == [(MAC, {"cmd": "resync"})]
+    # Within RESYNC_TIMEOUT of the last request
+    node.checkSequence(12, None, 2.0)
+    assert len(commands) == 1 and node.sq_gaps == 3
+
+
+async def test_late_and_duplicate_sequence_numbers_are_no_gap(hass, bridge):
+    recordCommands(bridge)
+    node = Node(bridge, MAC, "Node", delta=True)
+    for sq in (10, 11, 11, 9, 12):
+        node.checkSequence(sq, None, 0.0)
+    assert (node.last_sq, node.sq_gaps) == (12, 0)
+    # Further back than the reorder window is a restart, not a late message.
+    node.checkSequence(40000, None, 0.0)
+    node.checkSequence(40001, None, 0.0)
+    assert (node.last_sq, node.sq_gaps) == (40001, 0)
+
+
+async def test_aliases(hass, bridge):
+    events = async_capture_events(hass, EVENT_TYPE)
+    node = Node(bridge, MAC, "Node")
+    bridge.dispatchMessage({"MAC": MAC, "$temperature": {"k": "t"}, "^button": {"t": "button", "k": "b"}, "t": 20})
+    values = []
+    node.sensors["temperature"].handleNewValue = values.append
+    # The first message compiles the plan for its layout, the second uses it.
+    bridge.dispatchMessage({"MAC": MAC, "t": 21.5, "@b": 1})
+    bridge.dispatchMessage({"MAC": MAC, "t": 22, "@b": 0})
+    await hass.async_block_till_done()
+    assert values == [21.5, 22]
+    assert [(e.data["type"], e.data["value"]) for e in events] == [("button", 1), ("button", 0)]
+    assert node.takeEvents({"MAC": MAC, "@b": 1, "env": {"@b": 2}}) == {"button": 1, "env b": 2}
+
+
+async def test_rssi_is_a_sensor_without_sequence_numbers(hass, bridge):
+    node = Node(bridge, MAC, "Node")
+    bridge.dispatchMessage({"MAC": MAC, "$rssi": {"u": "dBm"}})
+    values = []
+    node.sensors["rssi"].handleNewValue = values.append
+    bridge.dispatchMessage({"MAC": MAC, "rssi": -60})
+    bridge.dispatchMessage({"MAC": MAC, "sq": 1, "rssi": -70})
+    assert values == [-60]
+
+
+async def test_plans_are_dropped_with_the_missing_sensors(hass, bridge):
+    node = Node(bridge, MAC, "Node")
+    bridge.dispatchMessage({"MAC": MAC, "a": 1})
+    assert node._plans and "a" in node._missing_sensors
+    for i in range(MAX_MISSING_SENSORS):
+        node.sensorFromEntity("s{}".format(i))
+    # A plan without "a" would outlive a later registry entry for it.
+    assert not node._plans
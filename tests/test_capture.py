@@ -0,0 +1,53 @@
+import asyncio
+
+from esp_now_bridge.capture import CaptureReader, CaptureWriter, replay
+
+
+def test_append_and_find(tmp_path):
+    path = str(tmp_path / "espnow.cap")
+    writer = CaptureWriter(path, 4096)
+    writer.append(b'{"MAC": "AA:00:00:00:00:01"}', "AA:00:00:00:00:01", 1.0)
+    writer.append(b"debug output", None, 2.0)
+    writer.append(b'{"MAC": "AA:00:00:00:00:02"}', "AA:00:00:00:00:02", 3.0)
+    writer.close()
+    reader = CaptureReader(path)
+    assert len(reader) == 3
+    assert [frame for _, _, frame in reader.find()] == [
+        b'{"MAC": "AA:00:00:00:00:01"}', b"debug output", b'{"MAC": "AA:00:00:00:00:02"}']
+    assert [mac for _, mac, _ in reader.find(mac="aa-00-00-00-00-02")] == ["AA:00:00:00:00:02"]
+    first = reader.record(0)[0]
+    assert [frame for _, _, frame in reader.find(start=first + 0.5)] == [
+        b"debug output", b'{"MAC": "AA:00:00:00:00:02"}']
+
+
+def test_ring_overwrites_oldest(tmp_path):
+    path = str(tmp_path / "espnow.cap")
+    writer = CaptureWriter(path, 256)
+    for i in range(50):
+        writer.append(b"frame %03d" % i, None, float(i))
+    writer.close()
+    frames = [frame for _, _, frame in CaptureReader(path).find()]
+    assert frames[-1] == b"frame 049"
+    assert frames == [b"frame %03d" % i for i in range(50 - len(frames), 50)]
+
+
+def test_reopen_continues_capture(tmp_path):
+    path = str(tmp_path / "espnow.cap")
+    writer = CaptureWriter(path, 1024)
+    writer.append(b"one", None, 1.0)
+    writer.close()
+    writer = CaptureWriter(path, 1024)
+    writer.append(b"two", None, 2.0)
+    writer.close()
+    assert [frame for _, _, frame in CaptureReader(path).find()] == [b"one", b"two"]
+
+
+def test_replay(tmp_path):
+    path = str(tmp_path / "espnow.cap")
+    writer = CaptureWriter(path, 1024)
+    for i in range(3):
+        writer.append(b"frame %d" % i, None, float(i))
+    writer.close()
+    frames = []
+    assert asyncio.run(replay(path, frames.append, speed=0)) == 3
+    assert frames == [b"frame 0", b"frame 1", b"frame 2"]
@@ -0,0 +1,59 @@
+import asyncio
+import gc
+
+from esp_now_bridge.commands import CommandSender
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def sender(rate=4000, ack_timeout=0.05, retries=1):
+    writes = []
+
+    async def write(port, data):
+        writes.append((port, data))
+    commands = CommandSender(asyncio.get_running_loop(), write, rate, ack_timeout, retries)
+    task = asyncio.get_running_loop().create_task(commands.run())
+    return commands, writes, task
+
+
+def test_batches_and_acknowledges():
+    async def test():
+        commands, writes, task = await sender()
+        first = commands.send("AA", {"cmd": "on"}, "p1")
+        second = commands.send("BB", {"cmd": "off"}, "p1", ack=False)
+        await asyncio.sleep(0.01)
+        assert len(writes) == 1
+        assert writes[0][1] == b'{"MAC":"AA","id":1,"cmd":"on"}\n{"MAC":"BB","id":2,"cmd":"off"}\n'
+        assert second.result() is True
+        commands.acknowledge(1)
+        assert await first is True
+        task.cancel()
+    run(test())
+
+
+def test_resends_and_fails_without_ack():
+    async def test():
+        commands, writes, task = await sender(rate=0)
+        future = commands.send("AA", {"cmd": "on"}, "p1")
+        try:
+            await asyncio.wait_for(future, 1)
+        except asyncio.TimeoutError:
+            pass
+        assert len(writes) == 2
+        assert (commands.resent, commands.failed) == (1, 1)
+        task.cancel()
+    run(test())
+
+
+def test_unawaited_failures_are_not_reported(caplog):
+    async def test():
+        commands, writes, task = await sender(rate=0, retries=0)
+        commands.send("AA", {"cmd": "resync"}, "p1")
+        await asyncio.sleep(0.2)
+        assert commands.failed == 1
+        task.cancel()
+    run(test())
+    gc.collect()
+    assert "never retrieved" not in caplog.text
@@ -0,0 +1,62 @@
+import msgpack
+
+from esp_now_bridge.framing import FRAME_MSGPACK_BYTE, FrameSplitter, parseFrame
+from esp_now_bridge.stats import BridgeStats
+
+
+def binaryFrame(msg):
+    payload = msgpack.packb(msg)
+    return FRAME_MSGPACK_BYTE + len(payload).to_bytes(2, "big") + payload
+
+
+def test_split_keeps_partial_tail():
+    splitter = FrameSplitter()
+    assert splitter.feed(b'{"a": 1}\n{"b"') == [b'{"a": 1}']
+    assert splitter.feed(b': 2}\n') == [b'{"b": 2}']
+    assert splitter.feed(b'') == []
+
+
+def test_split_mixed_text_and_binary():
+    splitter = FrameSplitter()
+    frame = binaryFrame({"MAC": "AA", "t": 1})
+    data = b'{"a": 1}\n' + frame + b'{"b": 2}\n'
+    frames = []
+    for i in range(0, len(data), 5):
+        frames += splitter.feed(data[i:i + 5])
+    assert frames == [b'{"a": 1}', frame, b'{"b": 2}']
+
+
+def test_split_drops_oversized_garbage():
+    splitter = FrameSplitter(max_frame=16)
+    assert splitter.feed(b"x" * 32) == []
+    assert splitter.feed(b'{"a": 1}\n') == [b'{"a": 1}']
+
+
+def test_split_resyncs_after_invalid_frame_length():
+    splitter = FrameSplitter()
+    lines = [b'{"n": %d}' % i for i in range(1000)]
+    data = b"\xc1\x7f\xff" + b"\n".join(lines) + b"\n"
+    frames = []
+    for i in range(0, len(data), 4096):
+        frames += splitter.feed(data[i:i + 4096])
+    assert frames == lines[1:]
+
+
+def test_parse_json_and_msgpack():
+    assert parseFrame(b' {"MAC": "AA", "t": 1.5}\r') == {"MAC": "AA", "t": 1.5}
+    assert parseFrame(binaryFrame({"MAC": "AA", "t": 1.5})) == {"MAC": "AA", "t": 1.5}
+
+
+def test_parse_ignores_debug_output_and_counts_errors():
+    stats = BridgeStats()
+    assert parseFrame(b"I (123) wifi: started") is None
+    assert stats.parse_errors == 0
+    assert parseFrame(b'{"MAC": ', stats) is None
+    assert parseFrame(binaryFrame([1, 2]), stats) is None
+    assert stats.parse_errors == 2
+
+
+def test_msgpack_keys_become_strings():
+    msg = parseFrame(binaryFrame({"MAC": "AA", 5: 21.5, "env": {1: 2, b"h": 3}}))
+    assert msg == {"MAC": "AA", "5": 21.5, "env": {"1": 2, "h": 3}}
+    assert list(msg) == ["MAC", "5", "env"]
@@ -0,0 +1,96 @@
+import pytest
+
+from esp_now_bridge.ingest import Deduplicator, IngestQueue, dedupKey, isTelemetry
+
+
+def test_fifo_below_maxsize():
+    queue = IngestQueue(10)
+    for i in range(3):
+        queue.put({"MAC": "AA", "t": i}, i)
+    assert queue.get(2) == [({"MAC": "AA", "t": 0}, 0), ({"MAC": "AA", "t": 1}, 1)]
+    assert len(queue) == 1
+
+
+def test_full_queue_merges_telemetry_per_node():
+    queue = IngestQueue(2)
+    queue.put({"MAC": "AA", "t": 1, "env": {"h": 40}})
+    queue.put({"MAC": "BB", "t": 5})
+    queue.put({"MAC": "AA", "t": 2, "env": {"p": 1000}})
+    assert [msg for msg, _ in queue.get(10)] == [
+        {"MAC": "AA", "t": 2, "env": {"h": 40, "p": 1000}},
+        {"MAC": "BB", "t": 5},
+    ]
+    assert queue.merged == 1
+    assert queue.high_water == 2
+
+
+def test_events_and_config_are_barriers():
+    queue = IngestQueue(2)
+    queue.put({"MAC": "AA", "t": 1})
+    queue.put({"MAC": "AA", "@press": 1})
+    queue.put({"MAC": "AA", "t": 2})
+    queue.put({"MAC": "AA", "$t": {"u": "C"}})
+    msgs = [msg for msg, _ in queue.get(10)]
+    assert {"MAC": "AA", "@press": 1} in msgs
+    assert {"MAC": "AA", "$t": {"u": "C"}} in msgs
+    assert msgs.index({"MAC": "AA", "@press": 1}) < msgs.index({"MAC": "AA", "$t": {"u": "C"}})
+
+
+def test_merges_only_behind_the_last_barrier():
+    queue = IngestQueue(3)
+    queue.put({"MAC": "AA", "t": 1})
+    queue.put({"MAC": "AA", "@press": 1})
+    queue.put({"MAC": "AA", "t": 2})
+    queue.put({"MAC": "AA", "t": 3})
+    assert [msg for msg, _ in queue.get(10)] == [
+        {"MAC": "AA", "t": 1}, {"MAC": "AA", "@press": 1}, {"MAC": "AA", "t": 3}]
+    assert len(queue) == 0
+
+
+@pytest.mark.parametrize("macs", [300, 3000])
+def test_full_queue_under_load(macs):
+    queue = IngestQueue(1000)
+    taken = 0
+    for i in range(20000):
+        queue.put({"MAC": i % macs, "t": i})
+        if i % 5000 == 2499:
+            taken += len(queue.get(100))
+    assert len(queue) == 1000
+    assert queue.merged + queue.dropped + len(queue) + taken == 20000
+    assert (queue.merged > 0) == (macs < 1000)
+    msgs = [msg for msg, _ in queue.get(2000)]
+    assert len(msgs) == 1000
+    assert len({msg["MAC"] for msg in msgs}) == min(macs, 1000)
+    assert not queue._telemetry and not queue._newest
+
+
+def test_drops_oldest_telemetry_when_merging_is_not_enough():
+    queue = IngestQueue(2)
+    queue.put({"MAC": "AA", "t": 1})
+    queue.put({"MAC": "BB", "t": 1})
+    queue.put({"MAC": "CC", "t": 1})
+    assert [msg["MAC"] for msg, _ in queue.get(10)] == ["BB", "CC"]
+    assert queue.dropped == 1
+
+
+def test_is_telemetry():
+    assert isTelemetry({"MAC": "AA", "env": {"t": 1}})
+    assert not isTelemetry({"MAC": "AA", "env": {"@press": 1}})
+    assert not isTelemetry({"MAC": "AA", "ack": 3})
+
+
+def test_deduplicator_window():
+    dedup = Deduplicator(1.0)
+    assert not dedup.isDuplicate(("AA", 1), 0.0)
+    assert dedup.isDuplicate(("AA", 1), 0.5)
+    assert not dedup.isDuplicate(("AA", 2), 0.5)
+    assert not dedup.isDuplicate(("AA", 1), 1.5)
+
+
+def test_dedup_key():
+    assert dedupKey({"MAC": "AA", "sq": 7, "rssi": -60}) == ("AA", 7)
+    a = dedupKey({"MAC": "AA", "env": {"t": [1, 2]}, "rssi": -60})
+    b = dedupKey({"MAC": "AA", "env": {"t": [1, 2]}, "rssi": -75})
+    assert a == b and hash(a) == hash(b)
+    assert dedupKey({"MAC": "AA", "env": {"@press": 1}}) is None
+    assert dedupKey({"MAC": "AA", "sq": 8, "env": {"@press": 1}}) == ("AA", 8)
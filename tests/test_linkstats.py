@@ -0,0 +1,57 @@
+from esp_now_bridge.linkstats import LINK_WINDOW, LinkStats
+
+
+def run(stats, sequence):
+    values = None
+    for sq in sequence:
+        values = stats.update(sq, None, None, 0.0) or values
+    return values
+
+
+def test_counts_lost_messages():
+    values = run(LinkStats(), [i for i in range(LINK_WINDOW) if i % 10 != 5])
+    assert values["loss"] == 10.0
+    assert values["duplicates"] == 0.0
+
+
+def test_late_message_is_reordered_not_lost():
+    stats = LinkStats()
+    run(stats, [1, 2, 4, 3])
+    assert (stats.lost, stats.reordered, stats.duplicates) == (0, 1, 0)
+    run(stats, [3, 4])
+    assert stats.duplicates == 2
+
+
+def test_sequence_wraps_around():
+    stats = LinkStats()
+    run(stats, [0xFFFE, 0xFFFF, 1])
+    assert stats.lost == 1
+    assert stats.highest == 1
+
+
+def test_jitter_and_rssi():
+    stats = LinkStats()
+    stats.update(None, 1000, -60, 10.0)
+    stats.update(None, 2000, -70, 11.02)
+    assert round(stats.jitter, 3) == 0.02
+    assert stats.rssi < -60
+
+
+def test_malformed_values_are_ignored():
+    stats = LinkStats()
+    assert stats.update(1.5, "1000", "-60", 0.0) is None
+    assert stats.update(True, float("nan"), [1], 0.0) is None
+    assert (stats.highest, stats._transit, stats.rssi) == (None, None, None)
+    stats.update(2, 1000, -60, 0.0)
+    assert (stats.highest, stats.rssi) == (2, -60)
+
+
+def test_publishes_without_sequence_numbers():
+    stats = LinkStats()
+    values = None
+    for i in range(LINK_WINDOW):
+        assert values is None
+        values = stats.update(None, None, -70, float(i))
+    assert values["rssi"] == -70
+    assert values["loss"] is None
+    assert stats.received == 0
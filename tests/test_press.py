@@ -0,0 +1,149 @@
+import pytest
+
+from esp_now_bridge import press
+from esp_now_bridge.press import PressFilter
+
+
+class Timer:
+    def __init__(self, loop, when, callback):
+        self.loop = loop
+        self.when = when
+        self.callback = callback
+
+    def cancel(self):
+        if self in self.loop.timers:
+            self.loop.timers.remove(self)
+
+
+class Loop:
+    """Manual stand-in for the event loop, also drives press.time.monotonic."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback):
+        timer = Timer(self, self.now + delay, callback)
+        self.timers.append(timer)
+        return timer
+
+    def advance(self, seconds):
+        end = self.now + seconds
+        while True:
+            due = [t for t in self.timers if t.when <= end]
+            if not due:
+                break
+            timer = min(due, key=lambda t: t.when)
+            self.timers.remove(timer)
+            self.now = timer.when
+            timer.callback()
+        self.now = end
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = Loop()
+    monkeypatch.setattr(press.time, "monotonic", loop.time)
+    return loop
+
+
+def pressFilter(loop, **options):
+    fired = []
+    f = PressFilter(loop, options, lambda data, extra, received: fired.append((data, extra)))
+    return f, fired
+
+
+def test_without_options_every_value_fires(loop):
+    f, fired = pressFilter(loop)
+    f.handle(1)
+    f.handle(1)
+    assert fired == [(1, None), (1, None)]
+
+
+def test_debounce_drops_repeats(loop):
+    f, fired = pressFilter(loop, db=0.5)
+    f.handle(1)
+    loop.advance(0.1)
+    f.handle(1)
+    loop.advance(0.5)
+    f.handle(1)
+    assert len(fired) == 2
+    assert f.suppressed == 1
+
+
+def test_debounce_keeps_the_release(loop):
+    f, fired = pressFilter(loop, db=0.3, lp=1.0)
+    f.handle(1)
+    loop.advance(0.2)
+    f.handle(0)
+    loop.advance(2)
+    assert fired == [(1, {"press_type": "single", "presses": 1})]
+
+
+def test_debounce_drops_contact_bounce(loop):
+    f, fired = pressFilter(loop, db=0.3, lp=1.0, mp=0.5)
+    for value in (1, 0, 1, 0):
+        f.handle(value)
+        loop.advance(0.01)
+    loop.advance(2)
+    assert fired == [(1, {"press_type": "single", "presses": 1})]
+    assert f.suppressed == 2
+
+
+def test_multi_press_counts_presses(loop):
+    f, fired = pressFilter(loop, mp=0.4)
+    f.handle(1)
+    loop.advance(0.2)
+    f.handle(1)
+    loop.advance(0.5)
+    assert fired == [(1, {"press_type": "double", "presses": 2})]
+
+
+def test_long_press_fires_while_held(loop):
+    f, fired = pressFilter(loop, lp=1.0)
+    f.handle(1)
+    loop.advance(1.5)
+    assert fired == [(1, {"press_type": "long", "presses": 1})]
+    f.handle(0)
+    assert len(fired) == 1
+
+
+def test_short_press_with_long_press_detection(loop):
+    f, fired = pressFilter(loop, lp=1.0)
+    f.handle(1)
+    loop.advance(0.2)
+    f.handle(0)
+    assert fired == [(1, {"press_type": "single", "presses": 1})]
+    loop.advance(2)
+    assert len(fired) == 1
+
+
+def test_long_press_ends_press_sequence(loop):
+    f, fired = pressFilter(loop, mp=0.5, lp=1.0)
+    f.handle({"value": 1, "n": 1})
+    loop.advance(0.1)
+    f.handle({"value": 0, "n": 1})
+    loop.advance(0.1)
+    f.handle({"value": 1, "n": 2})
+    loop.advance(1.5)
+    assert fired == [
+        ({"value": 1, "n": 1}, {"press_type": "single", "presses": 1}),
+        ({"value": 1, "n": 2}, {"press_type": "long", "presses": 1}),
+    ]
+
+
+def test_press_types():
+    assert press.pressTypes({"db": 0.2}) == []
+    assert press.pressTypes({"lp": 1}) == ["single", "long"]
+    assert press.pressTypes({"mp": 0.4, "lp": 1}) == ["single", "double", "triple", "multi", "long"]
+
+
+def test_cancel_stops_pending_timers(loop):
+    f, fired = pressFilter(loop, mp=0.4)
+    f.handle(1)
+    f.cancel()
+    loop.advance(1)
+    assert fired == []
@@ -0,0 +1,104 @@
+import pytest
+
+from esp_now_bridge import publish
+from esp_now_bridge.const import CONF_DEADBAND, CONF_MIN_INTERVAL
+from esp_now_bridge.publish import NO_VALUE, PublishPolicy
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(publish.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+def test_change_only(clock):
+    policy = PublishPolicy()
+    assert policy.accept(1)
+    assert not policy.accept(1)
+    assert policy.accept(2)
+    policy.configure("co", 0)
+    assert policy.accept(2)
+    assert policy.suppressed == 1
+
+
+def test_deadbands(clock):
+    policy = PublishPolicy({CONF_DEADBAND: 0.5})
+    assert policy.accept(20.0)
+    assert not policy.accept(20.4)
+    assert policy.accept(20.6)
+    policy = PublishPolicy()
+    policy.configure("rdb", 0.1)
+    assert policy.accept(100)
+    assert not policy.accept(109)
+    assert policy.accept(111)
+
+
+def test_min_interval_and_heartbeat(clock):
+    policy = PublishPolicy({CONF_MIN_INTERVAL: 10})
+    policy.configure("hb", 60)
+    assert policy.accept(1)
+    clock[0] = 5
+    assert not policy.accept(2)
+    clock[0] = 11
+    assert policy.accept(2)
+    clock[0] = 30
+    assert not policy.accept(2)
+    clock[0] = 80
+    assert policy.accept(2)
+
+
+def test_window_aggregates():
+    policy = PublishPolicy()
+    policy.configure("w", 60)
+    assert policy.collect(1.0, 30) == 60
+    assert policy.collect(2.0, 40) is None
+    assert policy.collect(6.0, 50) is None
+    assert policy.closeWindow() == 3.0
+    assert policy.suppressed == 2
+    policy.configure("wa", "max")
+    assert policy.collect(4.0, 61) == 120
+    policy.collect(2.0, 62)
+    assert policy.closeWindow() == 4.0
+    assert policy.closeWindow() is None
+
+
+def test_invalid_window_aggregate():
+    with pytest.raises(ValueError):
+        PublishPolicy().configure("wa", "median")
+    assert not PublishPolicy().configure("unknown", 1)
+
+
+def test_min_interval_keeps_last_suppressed_value(clock):
+    policy = PublishPolicy({CONF_MIN_INTERVAL: 10})
+    assert policy.accept(1)
+    assert policy.deadline() is None
+    clock[0] = 2
+    assert not policy.accept(2)
+    clock[0] = 3
+    assert not policy.accept(3)
+    assert policy.deadline() == 10
+    assert policy.due(9) is NO_VALUE
+    assert policy.due(10) == 3
+    assert policy.deadline() is None
+    assert policy.due(30) is NO_VALUE
+
+
+def test_value_back_to_written_drops_pending(clock):
+    policy = PublishPolicy({CONF_MIN_INTERVAL: 10})
+    assert policy.accept(1)
+    clock[0] = 2
+    assert not policy.accept(2)
+    assert not policy.accept(1)
+    assert policy.deadline() is None
+
+
+def test_heartbeat_rewrites_last_value(clock):
+    policy = PublishPolicy()
+    policy.configure("hb", 60)
+    assert policy.deadline() is None
+    assert policy.accept(5)
+    assert policy.deadline() == 60
+    assert policy.due(59) is NO_VALUE
+    assert policy.due(61) == 5
+    assert policy.deadline() == 121
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from esp_now_bridge.samples import aggregate, parseStatistics  # noqa: E402
+
+
+def test_parse_statistics():
+    assert parseStatistics("mean, MAX,p95") == ("mean", "max", "p95")
+    assert parseStatistics(["rms", "p99.9"]) == ("rms", "p99.9")
+
+
+@pytest.mark.parametrize("config", ["p101", "p-1", "pxx", "median", "", []])
+def test_parse_statistics_rejects_invalid(config):
+    with pytest.raises(ValueError):
+        parseStatistics(config)
+
+
+def test_aggregate():
+    values = aggregate([1, 2, 3, 4, 5], ("mean", "min", "max", "p50", "p100"))
+    assert values == {"mean": 3.0, "min": 1.0, "max": 5.0, "p50": 3.0, "p100": 5.0}
+    assert list(values) == ["mean", "min", "max", "p50", "p100"]
+
+
+def test_aggregate_rms_and_std():
+    assert aggregate([3, -4], ("rms", "std")) == {"rms": 3.535534, "std": 3.5}
+
+
+def test_aggregate_flattens_and_skips_empty():
+    assert aggregate([[1, 2], [3, 6]], ("mean",)) == {"mean": 3.0}
+    assert aggregate([], ("mean",)) is None
@@ -0,0 +1,66 @@
+from esp_now_bridge.timerwheel import TimerWheel
+
+
+class Item:
+    def __init__(self, deadlines=()):
+        self.calls = []
+        self.deadlines = list(deadlines)
+
+    def onTimer(self, now):
+        self.calls.append(now)
+        return self.deadlines.pop(0) if self.deadlines else None
+
+
+def test_runs_due_items_once():
+    wheel = TimerWheel(0, 1.0, slots=8)
+    item = Item()
+    wheel.schedule(item, 3)
+    wheel.advance(2.5)
+    assert item.calls == []
+    wheel.advance(3.2)
+    wheel.advance(10)
+    assert item.calls == [3.2]
+
+
+def test_reschedules_returned_deadline():
+    wheel = TimerWheel(0, 1.0, slots=8)
+    item = Item([6])
+    wheel.schedule(item, 2)
+    wheel.advance(2)
+    wheel.advance(5.9)
+    assert item.calls == [2]
+    wheel.advance(6)
+    assert item.calls == [2, 6]
+
+
+def test_deadline_beyond_one_revolution_comes_around():
+    wheel = TimerWheel(0, 1.0, slots=4)
+    item = Item()
+    wheel.schedule(item, 6)
+    wheel.advance(100)
+    assert item.calls == [100]
+
+
+def test_past_deadline_runs_on_next_tick():
+    wheel = TimerWheel(10, 1.0, slots=8)
+    item = Item()
+    wheel.schedule(item, 3)
+    wheel.advance(10.5)
+    assert item.calls == []
+    wheel.advance(11)
+    assert item.calls == [11]
+
+
+def test_schedule_again_moves_item():
+    wheel = TimerWheel(0, 1.0, slots=8)
+    item = Item()
+    wheel.schedule(item, 5)
+    wheel.schedule(item, 2)
+    wheel.advance(3)
+    assert item.calls == [3]
+    wheel.schedule(item, 4)
+    wheel.schedule(item, 7)
+    wheel.advance(6)
+    assert item.calls == [3]
+    wheel.advance(7)
+    assert item.calls == [3, 7]
@@ -0,0 +1,52 @@
+"""Timer wheel shared by all nodes and sensors of a bridge."""
+from __future__ import annotations
+
+DEFAULT_SLOTS = 1024
+
+
+class TimerWheel:
+    """Coarse timers driven by one periodic tick instead of one callback each.
+
+    Scheduled items need an onTimer(now) method. It is called on the first
+    tick at or after the scheduled time and returns the next deadline to be
+    rescheduled at, or None. Items can push their real deadline back without
+    touching the wheel; onTimer just returns the later time when it is called
+    early. Scheduling an item that is already scheduled moves it. Deadlines
+    further out than one revolution simply come around again.
+    """
+
+    def __init__(self, now, resolution=1.0, slots=DEFAULT_SLOTS):
+        self.resolution = resolution
+        self._slots = [set() for _ in range(slots)]
+        self._scheduled = {}
+        self._tick = int(now / resolution)
+
+    def schedule(self, item, deadline):
+        tick = max(int(deadline / self.resolution), self._tick + 1)
+        index = tick % len(self._slots)
+        old = self._scheduled.get(item)
+        if old is not None:
+            self._slots[old].discard(item)
+        self._slots[index].add(item)
+        self._scheduled[item] = index
+
+    def advance(self, now):
+        """Run all items that are due up to now."""
+        target = int(now / self.resolution)
+        steps = min(target - self._tick, len(self._slots))
+        self._tick = target - steps
+        for _ in range(steps):
+            self._tick += 1
+            index = self._tick % len(self._slots)
+            items = self._slots[index]
+            if not items:
+                continue
+            self._slots[index] = set()
+            for item in items:
+                if self._scheduled.get(item) != index:
+                    # Moved by an earlier item of this tick
+                    continue
+                del self._scheduled[item]
+                deadline = item.onTimer(now)
+                if deadline is not None:
+                    self.schedule(item, deadline)